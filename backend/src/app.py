@@ -1,17 +1,31 @@
 import os
-import json
-import math
 from datetime import datetime, timedelta, timezone
-from scraper import scrape_community_features
-from urls import DORM_URLS
 
 import jwt
-from flask import Flask, request
+from flask import Flask, Response, request
+from sqlalchemy import and_, or_, text
+from werkzeug.exceptions import HTTPException
 from dotenv import load_dotenv
-from google.oauth2 import id_token
-from google.auth.transport import requests as google_requests
 
-from db import db, User, Room, Knock, _validate_gender
+from config import database_uri, engine_options, env_flag, install_sqlite_pragmas
+from db import (db, User, Room, Knock, Amenity, RoomAmenity, DormFeature,
+                saved_rooms, insert_ignoring_duplicates, _validate_gender)
+from pagination import parse_limit, keyset_page, keyset_query
+from loaders import eager
+from projections import room_cards, room_cards_query
+from recommender import recommend
+from matching import graph, graph_refresher, verify
+from counters import bump, apply as apply_counters, summary, track_counters
+from bulk import parse_ids, item_error, bulk_response
+from instrumentation import metrics
+from feature_store import load_all, refresher
+from http_cache import NO_CACHE, cached, invalidate_on_commit, response_cache
+from auth_cache import auth_cache, invalidate_users_on_commit
+from serializers import dumps, JSONResponse
+from streaming import BATCH_SIZE as STREAM_BATCH_SIZE, batched, stream_format, stream_items
+from google_certs import cert_cache, verify_google_id_token
+from events import ASYNC_STREAMS_KEY, SUBSCRIPTION_KEY, bus, sse_stream
+from sync import ResyncRequired, changed, next_since, parse_since, record_tombstones, removed_ids
 
 # Environment
 load_dotenv()
@@ -22,19 +36,58 @@ if not os.environ.get("SECRET_KEY"):
     raise RuntimeError("SECRET_KEY missing from .env")
 
 app = Flask(__name__)
+app.response_class = JSONResponse
 app.config["GOOGLE_CLIENT_ID"] = os.environ["GOOGLE_CLIENT_ID"]
 app.config["SECRET_KEY"]       = os.environ["SECRET_KEY"]
 JWT_EXP_HOURS                  = int(os.environ.get("JWT_EXP_HOURS", 24))
+# request bodies past this are refused with 413 before they are read
+app.config["MAX_CONTENT_LENGTH"] = int(os.environ.get("MAX_CONTENT_LENGTH", 1024 * 1024))
 
 # SQLAlchemy
-app.config["SQLALCHEMY_DATABASE_URI"]        = "sqlite:///dormhop.db"
+app.config["SQLALCHEMY_DATABASE_URI"]        = database_uri()
+app.config["SQLALCHEMY_ENGINE_OPTIONS"]      = engine_options(app.config["SQLALCHEMY_DATABASE_URI"])
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-app.config["SQLALCHEMY_ECHO"]                = True
+app.config["SQLALCHEMY_ECHO"]                = env_flag("SQLALCHEMY_ECHO")
+
+# Background dorm-feature scraping (see feature_store.py)
+FEATURE_REFRESHER = env_flag("FEATURE_REFRESHER", default=True)
+
+# Opt-in per-request query instrumentation (Server-Timing + /api/admin/metrics/)
+QUERY_METRICS = env_flag("QUERY_METRICS")
+ADMIN_EMAILS  = {e.strip().lower() for e in os.environ.get("ADMIN_EMAILS", "").split(",") if e.strip()}
 
 db.init_app(app)
 with app.app_context():
+    install_sqlite_pragmas(db.engine)
+    if QUERY_METRICS:
+        metrics.init_app(app, db.engine)
+    bus.init_app(app, db.engine)
     db.create_all()
 
+# Response cache: any committed write to these models drops the cached
+# responses tagged with them (see http_cache.py)
+invalidate_on_commit(db.session, {
+    Room: "rooms",
+    RoomAmenity: "rooms",
+    User: "rooms",
+    DormFeature: "dorm_features",
+})
+invalidate_users_on_commit(db.session)
+record_tombstones(db.session)
+track_counters(db.session)
+
+@app.before_request
+def start_background_jobs():
+    """
+    Start the Google cert, swap graph and dorm-feature refreshers in
+    processes that actually serve requests (not in migrate.py /
+    seed_data.py, which also import app).
+    """
+    cert_cache.ensure_started()
+    graph_refresher.ensure_started(app)
+    if FEATURE_REFRESHER:
+        refresher.ensure_started(app)
+
 # JWT helpers
 def encode_token(user):
     """
@@ -63,23 +116,27 @@ def auth_required(view_fn):
     1. Checks for Bearer <JWT> in Authorization header.
     2. Validates the token and loads the user.
     3. Passes the user as first arg to the wrapped view.
+
+    Verified claims and a snapshot of the user are cached (auth_cache.py),
+    so repeat requests with the same token usually skip both jwt.decode
+    and the users SELECT.
     """
     def wrapper(*args, **kwargs):
         header = request.headers.get("Authorization", "")
         if not header.startswith("Bearer "):
-            return json.dumps({"error": "Missing Bearer token"}), 401
+            return dumps({"error": "Missing Bearer token"}), 401
 
         token = header.split(" ", 1)[1]
-        data = decode_token(token)
+        data = auth_cache.claims_for(token, decode_token)
         if not data:
-            return json.dumps({"error": "Invalid or expired token"}), 401
+            return dumps({"error": "Invalid or expired token"}), 401
         
         if not data["email"].endswith("@cornell.edu"):
-            return json.dumps({"error": "Cornell account required"}), 403
+            return dumps({"error": "Cornell account required"}), 403
 
-        user = User.query.get(data["user_id"])
+        user = auth_cache.user_for(data["user_id"])
         if not user:
-            return json.dumps({"error": "User not found"}), 404
+            return dumps({"error": "User not found"}), 404
 
         return view_fn(user, *args, **kwargs)
 
@@ -96,19 +153,15 @@ def verify_id_token():
     data         = request.get_json(force=True) or {}
     id_token_str = data.get("id_token")
     if not id_token_str:
-        return json.dumps({"error": "id_token required"}), 400
+        return dumps({"error": "id_token required"}), 400
 
     try:
-        info = id_token.verify_oauth2_token(
-            id_token_str,
-            google_requests.Request(),
-            app.config["GOOGLE_CLIENT_ID"],
-        )
+        info = verify_google_id_token(id_token_str, app.config["GOOGLE_CLIENT_ID"])
     except ValueError:
-        return json.dumps({"error": "Invalid Google ID token"}), 401
+        return dumps({"error": "Invalid Google ID token"}), 401
 
     if info.get("hd") and info["hd"] != "cornell.edu":
-        return json.dumps({"error": "Cornell account required"}), 403
+        return dumps({"error": "Cornell account required"}), 403
 
     email = info["email"]
     full_name = info.get("name", "")
@@ -124,7 +177,7 @@ def verify_id_token():
 
     token = encode_token(user)
     status = 201 if is_new else 200
-    return json.dumps({"token": token, "user": user.serialize()}), status
+    return dumps({"token": token, "user": user.serialize()}), status
 
 
 @app.route("/api/auth/register/", methods=["POST"])
@@ -135,14 +188,14 @@ def register_user():
     data = request.get_json(force=True) or {}
     required = {"email", "full_name", "class_year", "gender"}
     if not required.issubset(data):
-        return json.dumps({"error": "email, full_name, class_year, gender are mandatory"}), 400
+        return dumps({"error": "email, full_name, class_year, gender are mandatory"}), 400
     if User.query.filter_by(email=data["email"]).first():
-        return json.dumps({"error": "email already registered"}), 400
+        return dumps({"error": "email already registered"}), 400
 
     try:
         data["gender"] = _validate_gender(data["gender"])
     except ValueError as e:
-        return json.dumps({"error": str(e)}), 400
+        return dumps({"error": str(e)}), 400
 
     user = User(
         email=data["email"],
@@ -156,11 +209,15 @@ def register_user():
     if (room_data := data.get("current_room")):
         room_data["owner_id"] = user.id
         room_data["gender"]   = user.gender
-        db.session.add(Room(**room_data))
+        try:
+            db.session.add(Room(**room_data))
+        except ValueError as e:
+            db.session.rollback()
+            return dumps({"error": str(e)}), 400
     db.session.commit()
 
     token = encode_token(user)
-    return json.dumps({"token": token, "user": user.serialize()}), 201
+    return dumps({"token": token, "user": user.serialize()}), 201
 
 # User endpoints
 @app.route("/api/users/me/", methods=["GET"])
@@ -169,7 +226,17 @@ def get_profile(current_user):
     """
     Return the current user’s profile, including room information.
     """
-    return json.dumps(current_user.serialize()), 200
+    return dumps(current_user.serialize()), 200
+
+
+@app.route("/api/users/me/summary/", methods=["GET"])
+@auth_required
+def get_summary(current_user):
+    """
+    Badge counts for the caller: pending knocks on their room, knocks
+    sent, saved rooms, and listed rooms in their feed.
+    """
+    return dumps(summary(current_user)), 200
 
 
 @app.route("/api/users/me/room/", methods=["PATCH"])
@@ -181,22 +248,26 @@ def update_room(current_user):
     data = request.get_json(force=True) or {}
     required = {"dorm", "room_number", "occupancy"}
     if not required.issubset(data):
-        return json.dumps({"error": "dorm, room_number, occupancy are required"}), 400
-
-    if current_user.room:
-        r = current_user.room
-        r.dorm        = data["dorm"]
-        r.room_number = data["room_number"]
-        r.occupancy   = data["occupancy"]
-        r.amenities   = json.dumps(data.get("amenities", []))
-        r.description = data.get("description")
-        r.gender      = current_user.gender
-    else:
-        data["owner_id"] = current_user.id
-        data["gender"]   = current_user.gender
-        r = Room(**data)
-        db.session.add(r)
-        current_user.room = r
+        return dumps({"error": "dorm, room_number, occupancy are required"}), 400
+
+    try:
+        if current_user.room:
+            r = current_user.room
+            r.dorm        = data["dorm"]
+            r.room_number = data["room_number"]
+            r.occupancy   = data["occupancy"]
+            r.amenities   = data.get("amenities")
+            r.description = data.get("description")
+            r.gender      = current_user.gender
+        else:
+            data["owner_id"] = current_user.id
+            data["gender"]   = current_user.gender
+            r = Room(**data)
+            db.session.add(r)
+            current_user.room = r
+    except ValueError as e:
+        db.session.rollback()
+        return dumps({"error": str(e)}), 400
 
     current_user.is_room_listed = True
     db.session.commit()
@@ -204,7 +275,7 @@ def update_room(current_user):
     resp = r.serialize()
     resp["updated_at"] = datetime.now(timezone.utc).isoformat()
     resp["is_room_listed"] = True
-    return json.dumps(resp), 200
+    return dumps(resp), 200
 
 
 @app.route("/api/users/me/room/visibility/", methods=["PATCH"])
@@ -215,11 +286,11 @@ def set_visibility(current_user):
     """
     data = request.get_json(force=True) or {}
     if "is_room_listed" not in data:
-        return json.dumps({"error": "is_room_listed required"}), 400
+        return dumps({"error": "is_room_listed required"}), 400
 
     current_user.is_room_listed = bool(data["is_room_listed"])
     db.session.commit()
-    return json.dumps({
+    return dumps({
         "is_room_listed": current_user.is_room_listed,
         "updated_at": datetime.now(timezone.utc).isoformat()
     }), 200
@@ -227,56 +298,122 @@ def set_visibility(current_user):
 # Room endpoints
 @app.route("/api/rooms/<int:room_id>/", methods=["GET"])
 @auth_required
+@cached("rooms", ttl=30, key=lambda user, room_id: (user.id, user.gender, room_id))
 def get_room(current_user, room_id):
     """
     Return a single room by its ID.
     Owners always may fetch; others only if listed.
     """
-    room = Room.query.get(room_id)
+    room = eager(Room.query, "room_with_owner").get(room_id)
     if not room:
-        return json.dumps({"error": "Room not found"}), 404
+        return dumps({"error": "Room not found"}), 404
     if room.owner_id != current_user.id and not room.owner.is_room_listed:
-        return json.dumps({"error": "Room not found"}), 404
+        return dumps({"error": "Room not found"}), 404
     if room.gender != current_user.gender and room.owner_id != current_user.id:
-        return json.dumps({"error": "Room not available"}), 403
+        return dumps({"error": "Room not available"}), 403
 
-    data = room.serialize()
-    data["owner"] = {
-        "full_name": room.owner.full_name,
-        "class_year": room.owner.class_year
-    }
-    return json.dumps(data), 200
+    return dumps(room.serialize_with_owner()), 200
 
 
 @app.route("/api/rooms/", methods=["GET"])
 @auth_required
+@cached("rooms", ttl=30, key=lambda user: (user.id, user.gender, request.query_string)
+        if request.args.get("since") is None else NO_CACHE)
 def list_rooms(current_user):
     """
-    Return all listed rooms except the caller's own room.
+    Return one page of listed rooms except the caller's own room.
     Users with 'other' gender can see all rooms, while male/female
     users only see rooms of their own gender.
+
+    Query params (all optional):
+        limit      page size (default 50, max 100)
+        cursor     `next_cursor` from the previous page
+        dorm       repeatable, e.g. ?dorm=Balch Hall&dorm=Mews Hall
+        occupancy  repeatable integer
+        amenity    repeatable; a room must have every amenity given
+        stream     json | ndjson: stream every matching room from `cursor`
+                   on instead of one page (limit / next_cursor ignored)
+        since      `next_since` of an earlier sync: only rooms changed since
+                   then, plus `removed` ids (limit / cursor / stream ignored)
     """
-    query = Room.query.join(User).filter(
+    try:
+        limit = parse_limit(request.args.get("limit"))
+        occupancies = [int(o) for o in request.args.getlist("occupancy")]
+    except ValueError:
+        return dumps({"error": "limit and occupancy must be integers"}), 400
+
+    query = room_cards_query().filter(
         User.is_room_listed.is_(True),
         User.id != current_user.id
     )
 
-    # Gender filtering
+    # Gender filtering. Room.gender always mirrors the owner's gender;
+    # filtering on it too lets the feed walk ix_rooms_gender_updated_at_id
+    # in keyset order and stop after one page.
     if current_user.gender != "other":
-        query = query.filter(User.gender == current_user.gender)
+        query = query.filter(User.gender == current_user.gender,
+                             Room.gender == current_user.gender)
+    visible = query
+
+    # Server-side filters
+    if (dorms := request.args.getlist("dorm")):
+        query = query.filter(Room.dorm.in_(dorms))
+    if occupancies:
+        query = query.filter(Room.occupancy.in_(occupancies))
+    if (amenities := set(request.args.getlist("amenity"))):
+        has_all = (db.session.query(RoomAmenity.room_id)
+                   .join(Amenity)
+                   .filter(Amenity.name.in_(amenities))
+                   .group_by(RoomAmenity.room_id)
+                   .having(db.func.count() == len(amenities)))
+        query = query.filter(Room.id.in_(has_all))
+
+    if request.args.get("since") is not None:
+        return _room_delta(visible, query)
+
+    try:
+        fmt = stream_format()
+        if fmt:
+            rows = keyset_query(query, Room, request.args.get("cursor"))
+            batches = (room_cards(batch)
+                       for batch in batched(rows.yield_per(STREAM_BATCH_SIZE)))
+            return stream_items(fmt, "rooms", batches, with_total=True)
+        rooms, next_cursor = keyset_page(query, Room, request.args.get("cursor"), limit)
+    except ValueError as e:
+        return dumps({"error": str(e)}), 400
 
-    rooms = query.all()
+    out = room_cards(rooms)
 
-    out = []
-    for r in rooms:
-        d = r.serialize()
-        d["owner"] = {
-            "full_name": r.owner.full_name,
-            "class_year": r.owner.class_year
-        }
-        out.append(d)
+    return dumps({"rooms": out, "total": len(out), "next_cursor": next_cursor}), 200
 
-    return json.dumps({"rooms": out, "total": len(out)}), 200
+def _room_delta(visible, matching):
+    """
+    ?since= mode of list_rooms: rooms of `matching` changed since the
+    token, plus ids to drop. A room drops out when it is tombstoned, or
+    when it changed but no longer matches the filters.
+    """
+    started = datetime.now(timezone.utc)
+    try:
+        since = parse_since(request.args["since"])
+        rows = changed(matching.order_by(Room.updated_at.desc(), Room.id.desc()),
+                       Room.updated_at > since)
+        kept = {row.id for row in rows}
+        removed = removed_ids("room", since)
+        if matching is not visible:
+            stale = changed(visible.with_entities(Room.id), Room.updated_at > since)
+            removed |= {row.id for row in stale}
+    except ValueError as e:
+        return dumps({"error": str(e)}), 400
+    except ResyncRequired as e:
+        return dumps({"error": str(e)}), 410
+
+    out = room_cards(rows)
+    return dumps({
+        "rooms": out,
+        "removed": sorted(removed - kept),
+        "total": len(out),
+        "next_since": next_since(started),
+    }), 200
 
 
 @app.route("/api/recommendations/", methods=["GET"])
@@ -284,40 +421,24 @@ def list_rooms(current_user):
 def recommend_rooms(current_user):
     """
     Recommend rooms based on amenities & occupancy similarity.
+    Every candidate is returned unless ?limit= (max 100) caps the results.
     """
     if not current_user.room:
-        return json.dumps({"error": "User has no current room"}), 400
-
-    user_amen = json.loads(current_user.room.amenities)
-    user_occ = current_user.room.occupancy
-
-    rooms = (Room.query
-             .filter(Room.owner_id != current_user.id)
-             .join(User)
-             .filter(User.is_room_listed.is_(True),
-                     User.gender == current_user.gender)
-             .all())
-
-    scored = []
-    for r in rooms:
-        a_score = (_cosine := (
-            len(set(user_amen).intersection(json.loads(r.amenities)))
-            / math.sqrt(len(user_amen) * len(json.loads(r.amenities)))
-        ) if user_amen and json.loads(r.amenities) else 0.0)
-        o_score = 1.0 if r.occupancy == user_occ else 0.5
-        total = 0.7 * a_score + 0.3 * o_score
-        scored.append((r, total))
-
-    scored.sort(key=lambda x: x[1], reverse=True)
-    out = []
-    for r, score in scored:
-        d = r.serialize()
+        return dumps({"error": "User has no current room"}), 400
+
+    limit = None
+    if "limit" in request.args:
+        try:
+            limit = parse_limit(request.args["limit"])
+        except ValueError:
+            return dumps({"error": "limit must be an integer"}), 400
+
+    picked = recommend(current_user, limit)
+    out = room_cards([row for row, _ in picked])
+    for d, (_, score) in zip(out, picked):
         d["similarity_score"] = round(score, 2)
-        d["owner"] = {"full_name": r.owner.full_name,
-                      "class_year": r.owner.class_year}
-        out.append(d)
 
-    return json.dumps({"rooms": out, "total": len(out)}), 200
+    return dumps({"rooms": out, "total": len(out)}), 200
 
 @app.route("/api/knocks/", methods=["POST"])
 @auth_required
@@ -328,62 +449,102 @@ def send_knock(current_user):
     data = request.get_json(force=True) or {}
     room_id = data.get("to_room_id")
     if not room_id:
-        return json.dumps({"error": "to_room_id required"}), 400
+        return dumps({"error": "to_room_id required"}), 400
 
     if not current_user.room:
-        return json.dumps({"error": "Create/list your room before knocking"}), 400
+        return dumps({"error": "Create/list your room before knocking"}), 400
 
     # fetch & validate
-    room = Room.query.get(room_id)
+    room = eager(Room.query, "room_with_owner").get(room_id)
     if not room or not room.owner.is_room_listed:
-        return json.dumps({"error": "Room not found"}), 404
+        return dumps({"error": "Room not found"}), 404
     if room.owner_id == current_user.id:
-        return json.dumps({"error": "Cannot knock your own room"}), 400
+        return dumps({"error": "Cannot knock your own room"}), 400
 
     # Modified gender validation
     if (current_user.gender != "other" and 
         room.gender != current_user.gender):
-        return json.dumps({"error": "Cannot knock a different‑gender room"}), 403
-
-    # ensure we haven't already knocked
-    exists = Knock.query.filter_by(
-        from_user_id=current_user.id,
-        to_room_id=room_id
-    ).first()
-    if exists:
-        return json.dumps({"error": "Already knocked"}), 400
-
-    # create the knock
-    knock = Knock(from_user_id=current_user.id, to_room_id=room_id)
-    db.session.add(knock)
+        return dumps({"error": "Cannot knock a different‑gender room"}), 403
+
+    # plain values: the commit below expires current_user and room
+    me, owner_id, room_id = current_user.id, room.owner_id, room.id
+    my_room_id, owner_email = current_user.room.id, room.owner.email
+
+    # One transaction: accept the owner's pending knock on my room if there
+    # is one, then insert mine (already accepted in that case). The unique
+    # (from_user_id, to_room_id) index turns a duplicate into a no-op
+    # instead of a separate existence check.
+    now = datetime.now(timezone.utc)
+    if db.engine.dialect.name == "postgresql":
+        # Serialize concurrent knocks between the same two rooms (and only
+        # those), so the second always sees the first one's knock. SQLite
+        # already serializes writers.
+        db.session.execute(text("SELECT pg_advisory_xact_lock(:a, :b)"),
+                           {"a": min(room_id, my_room_id), "b": max(room_id, my_room_id)})
+    matched = db.session.execute(
+        Knock.__table__.update()
+        .where(Knock.from_user_id == owner_id,
+               Knock.to_room_id == my_room_id,
+               Knock.status == "pending")
+        .values(status="accepted", accepted_at=now)
+    ).rowcount
+    inserted = db.session.execute(
+        insert_ignoring_duplicates(Knock.__table__).values(
+            from_user_id=me,
+            to_room_id=room_id,
+            status="accepted" if matched else "pending",
+            accepted_at=now if matched else None,
+        )
+    ).rowcount
+    if not inserted:
+        db.session.rollback()
+        return dumps({"error": "Already knocked"}), 400
+    # Core statements skip the flush listener that maintains the counters;
+    # a match also takes the owner's knock off my pending count
+    apply_counters({
+        me: {"knocks_sent": 1, "knocks_received_pending": -1 if matched else 0},
+        owner_id: {"knocks_received_pending": 0 if matched else 1},
+    })
     db.session.commit()
 
-    # check for a reciprocal knock
-    reciprocal = Knock.query.filter_by(
-        from_user_id=room.owner_id,
-        to_room_id=current_user.room.id,
-        status="pending"
-    ).first()
-
-    if reciprocal:
-        # auto-accept both
-        now = datetime.now(timezone.utc)
-        knock.status = "accepted"
-        knock.accepted_at = now
-        reciprocal.status = "accepted"
-        reciprocal.accepted_at = now
-        db.session.commit()
-
+    # both knocks (mine, and the owner's if it was matched) in one read
+    knocks = eager(Knock.query, "knock_full").filter(or_(
+        and_(Knock.from_user_id == me, Knock.to_room_id == room_id),
+        and_(Knock.from_user_id == owner_id, Knock.to_room_id == my_room_id),
+    )).all()
+    knock = next(k for k in knocks if k.from_user_id == me)
+
+    # Core statements skip the ORM events that maintain the swap graph
+    graph.remove_knock(owner_id, my_room_id)
+    if not matched:
+        graph.add_knock(knock.id, me, room_id, owner_id)
+    bus.publish([me, owner_id], "knock.created", knock.serialize())
+
+    if matched:
+        reciprocal = next(k for k in knocks if k.from_user_id == owner_id)
         # build a unified response with contacts
         resp = knock.serialize()
         resp["contacts"] = {
             "requester_email": knock.from_user.email,
-            "owner_email":     room.owner.email
+            "owner_email":     owner_email
+        }
+        other = reciprocal.serialize()
+        other["contacts"] = {
+            "requester_email": owner_email,
+            "owner_email":     knock.from_user.email
         }
-        return json.dumps(resp), 200
+        for event in (resp, other):
+            bus.publish([me, owner_id], "knock.accepted", event)
+        return dumps(resp), 200
 
-    # if no reciprocal, just return the new knock
-    return json.dumps(knock.serialize()), 201
+    # no two-way swap; report longer swap cycles this knock completes
+    resp = knock.serialize()
+    cycles = verify(graph.cycles_through(me, owner_id))
+    if cycles:
+        resp["swap_cycles"] = cycles
+        for cycle in cycles:
+            bus.publish(cycle["users"], "swap.cycle", cycle)
+    return dumps(resp), 201
 
 @app.route("/api/knocks/sent/", methods=["GET"])
 @auth_required
@@ -391,9 +552,11 @@ def list_sent_knocks(current_user):
     """
     List all knocks sent by the current user.
     Returns array of knock objects with room and status info.
+    Optional ?stream=json|ndjson streams the list; ?since= returns
+    only what changed (see _knock_list).
     """
-    knocks = Knock.query.filter_by(from_user_id=current_user.id).all()
-    return json.dumps({"knocks": [k.serialize() for k in knocks]}), 200
+    query = eager(Knock.query, "knock_full").filter_by(from_user_id=current_user.id)
+    return _knock_list(query, current_user.id)
 
 @app.route("/api/knocks/received/", methods=["GET"])
 @auth_required
@@ -401,12 +564,45 @@ def list_received_knocks(current_user):
     """
     List all knocks received on the user's room.
     Returns array of knock objects with sender info.
+    Optional ?stream=json|ndjson streams the list; ?since= returns
+    only what changed (see _knock_list).
+    """
+    query = (eager(Knock.query.join(Room, Knock.to_room), "knock_full_joined")
+                  .filter(Room.owner_id == current_user.id))
+    return _knock_list(query, current_user.id)
+
+def _knock_list(query, user_id: int):
     """
-    knocks = (Knock.query
-                   .join(Room, Knock.to_room)
-                   .filter(Room.owner_id == current_user.id)
-                   .all())
-    return json.dumps({"knocks": [k.serialize() for k in knocks]}), 200
+    {"knocks": [...]} for a knock query, streamed if ?stream= is given,
+    or only what changed for `user_id` if ?since= is.
+    """
+    if request.args.get("since") is not None:
+        started = datetime.now(timezone.utc)
+        try:
+            since = parse_since(request.args["since"])
+            rooms_changed = db.session.query(Room.id).filter(Room.updated_at > since)
+            knocks = changed(query.order_by(Knock.id), db.or_(Knock.updated_at > since,
+                                                          Knock.to_room_id.in_(rooms_changed)))
+            removed = removed_ids("knock", since, user_id)
+        except ValueError as e:
+            return dumps({"error": str(e)}), 400
+        except ResyncRequired as e:
+            return dumps({"error": str(e)}), 410
+        return dumps({
+            "knocks": [k.serialize() for k in knocks],
+            "removed": sorted(removed),
+            "next_since": next_since(started),
+        }), 200
+
+    try:
+        fmt = stream_format()
+    except ValueError as e:
+        return dumps({"error": str(e)}), 400
+    if fmt:
+        knocks = query.order_by(Knock.id).yield_per(STREAM_BATCH_SIZE)
+        batches = ([k.serialize() for k in batch] for batch in batched(knocks))
+        return stream_items(fmt, "knocks", batches)
+    return dumps({"knocks": [k.serialize() for k in query.all()]}), 200
 
 @app.route("/api/knocks/<int:knock_id>/", methods=["PATCH"])
 @auth_required
@@ -420,15 +616,15 @@ def accept_knock(current_user, knock_id):
     """
     data = request.get_json(force=True) or {}
     if data.get("status") != "accepted":
-        return json.dumps({"error": "Can only set status to 'accepted'"}), 400
+        return dumps({"error": "Can only set status to 'accepted'"}), 400
 
-    knock = Knock.query.get(knock_id)
+    knock = eager(Knock.query, "knock_with_room_owner").get(knock_id)
     if not knock:
-        return json.dumps({"error": "Knock not found"}), 404
+        return dumps({"error": "Knock not found"}), 404
     if knock.to_room.owner_id != current_user.id:
-        return json.dumps({"error": "Not authorized"}), 403
+        return dumps({"error": "Not authorized"}), 403
     if knock.status == "accepted":
-        return json.dumps({"error": "Already accepted"}), 400
+        return dumps({"error": "Already accepted"}), 400
 
     # mark accepted
     knock.status = "accepted"
@@ -441,7 +637,8 @@ def accept_knock(current_user, knock_id):
         "requester_email": knock.from_user.email,
         "owner_email":     current_user.email
     }
-    return json.dumps(resp), 200
+    bus.publish([knock.from_user_id, current_user.id], "knock.accepted", resp)
+    return dumps(resp), 200
 
 @app.route("/api/knocks/<int:knock_id>/", methods=["DELETE"])
 @auth_required
@@ -452,20 +649,94 @@ def delete_knock(current_user, knock_id):
     Either sender or receiver can delete.
     Returns 403 if not authorized.
     """
-    knock = Knock.query.get(knock_id)
+    knock = eager(Knock.query, "knock_with_room_owner").get(knock_id)
     if not knock:
-        return json.dumps({"error": "Knock not found"}), 404
+        return dumps({"error": "Knock not found"}), 404
 
     allowed = (
         knock.from_user_id == current_user.id or
         knock.to_room.owner_id == current_user.id
     )
     if not allowed:
-        return json.dumps({"error": "Not authorized"}), 403
+        return dumps({"error": "Not authorized"}), 403
 
+    parties = [knock.from_user_id, knock.to_room.owner_id]
     db.session.delete(knock)
     db.session.commit()
-    return json.dumps({"success": True}), 200
+    bus.publish(parties, "knock.deleted", {"id": knock_id})
+    return dumps({"success": True}), 200
+
+@app.route("/api/knocks/bulk/", methods=["POST"])
+@auth_required
+def bulk_knocks(current_user):
+    """
+    Accept and/or delete many knocks in one transaction.
+
+    Body: {"accept": [knock_id, ...], "delete": [knock_id, ...]}
+    Each id gets the status and error the single-knock endpoint would
+    have returned; the ones that fail are skipped, the rest commit.
+    """
+    try:
+        ids = parse_ids(request.get_json(force=True), ("accept", "delete"))
+    except ValueError as e:
+        return dumps({"error": str(e)}), 400
+
+    knocks = {k.id: k for k in eager(Knock.query, "knock_with_room_owner")
+              .filter(Knock.id.in_(ids["accept"] + ids["delete"]))}
+    now = datetime.now(timezone.utc)
+    results, events = [], []
+
+    for knock_id in ids["accept"]:
+        knock = knocks.get(knock_id)
+        if not knock:
+            results.append(item_error(knock_id, 404, "Knock not found"))
+        elif knock.to_room.owner_id != current_user.id:
+            results.append(item_error(knock_id, 403, "Not authorized"))
+        elif knock.status == "accepted":
+            results.append(item_error(knock_id, 400, "Already accepted"))
+        else:
+            knock.status = "accepted"
+            knock.accepted_at = now
+            # serialized before the commit expires it, saving a reload per knock
+            resp = knock.serialize()
+            resp["contacts"] = {
+                "requester_email": knock.from_user.email,
+                "owner_email":     current_user.email
+            }
+            events.append(([knock.from_user_id, current_user.id], "knock.accepted", resp))
+            results.append({"id": knock_id, "status": 200, "knock": resp})
+
+    for knock_id in ids["delete"]:
+        knock = knocks.get(knock_id)
+        if not knock:
+            results.append(item_error(knock_id, 404, "Knock not found"))
+        elif current_user.id not in (knock.from_user_id, knock.to_room.owner_id):
+            results.append(item_error(knock_id, 403, "Not authorized"))
+        else:
+            events.append(([knock.from_user_id, knock.to_room.owner_id], "knock.deleted", {"id": knock_id}))
+            db.session.delete(knock)
+            results.append({"id": knock_id, "status": 200})
+
+    db.session.commit()
+    for event in events:
+        bus.publish(*event)
+    return dumps(bulk_response(results)), 200
+
+@app.route("/api/swaps/", methods=["GET"])
+@auth_required
+def list_swap_cycles(current_user):
+    """
+    Multi-way swaps the caller is part of: cycles of pending knocks
+    (A knocked on B's room, B on C's, C on A's), shortest first.
+    Optional ?limit= (default 50, max 100).
+    """
+    try:
+        limit = parse_limit(request.args.get("limit"))
+    except ValueError:
+        return dumps({"error": "limit must be an integer"}), 400
+
+    cycles = verify(graph.cycles_of(current_user.id)[:limit])
+    return dumps({"cycles": cycles, "total": len(cycles)}), 200
 
 # Saved‑rooms endpoints
 @app.route("/api/users/me/saved_rooms/", methods=["POST"])
@@ -481,38 +752,60 @@ def save_room(current_user):
     data = request.get_json(force=True) or {}
     room_id = data.get("room_id")
     if not room_id:
-        return json.dumps({"error": "room_id required"}), 400
+        return dumps({"error": "room_id required"}), 400
 
-    room = Room.query.get(room_id)
+    room = eager(Room.query, "room_with_owner").get(room_id)
     if not room or not room.owner.is_room_listed or room.gender != current_user.gender:
-        return json.dumps({"error": "Room not found"}), 404
-    if room in current_user.saved_rooms:
-        return json.dumps({"error": "Already saved"}), 400
-
-    current_user.saved_rooms.append(room)
+        return dumps({"error": "Room not found"}), 404
+
+    # the (user_id, room_id) primary key turns a duplicate, concurrent or
+    # not, into a no-op instead of a separate existence check
+    inserted = db.session.execute(
+        insert_ignoring_duplicates(saved_rooms).values(user_id=current_user.id, room_id=room.id)
+    ).rowcount
+    if not inserted:
+        db.session.rollback()
+        return dumps({"error": "Already saved"}), 400
+    bump(current_user.id, saved_rooms=1)
     db.session.commit()
-    return json.dumps({"success": True}), 201
+    return dumps({"success": True}), 201
 
 @app.route("/api/users/me/saved_rooms/", methods=["GET"])
 @auth_required
 def list_saved_rooms(current_user):
     """
-    Return all rooms saved by the current user.
-    
+    Return the rooms saved by the current user, limited to rooms of the
+    user's gender, newest changes first.
+
     Each room includes basic owner information.
     Returns empty list if no rooms are saved.
+
+    Query params (optional; without either, every saved room is returned):
+        limit      page size (default 50, max 100)
+        cursor     `next_cursor` from the previous page
     """
-    output = []
-    for room in current_user.saved_rooms:
-        if room.gender != current_user.gender:
-            continue
-        data = room.serialize()
-        data["owner"] = {
-            "full_name": room.owner.full_name,
-            "class_year": room.owner.class_year
-        }
-        output.append(data)
-    return json.dumps({"saved_rooms": output}), 200
+    query = (room_cards_query()
+             .join(saved_rooms, saved_rooms.c.room_id == Room.id)
+             .filter(saved_rooms.c.user_id == current_user.id,
+                     Room.gender == current_user.gender))
+
+    if "limit" not in request.args and "cursor" not in request.args:
+        out = room_cards(keyset_query(query, Room, None).all())
+        return dumps({"saved_rooms": out, "total": len(out), "next_cursor": None}), 200
+
+    try:
+        limit = parse_limit(request.args.get("limit"))
+    except ValueError:
+        return dumps({"error": "limit must be an integer"}), 400
+    try:
+        rooms, next_cursor = keyset_page(query, Room, request.args.get("cursor"), limit)
+    except ValueError as e:
+        return dumps({"error": str(e)}), 400
+
+    out = room_cards(rooms)
+    # total counts every saved room, not just this page
+    total = query.order_by(None).count() if next_cursor or request.args.get("cursor") else len(out)
+    return dumps({"saved_rooms": out, "total": total, "next_cursor": next_cursor}), 200
 
 @app.route("/api/users/me/saved_rooms/<int:room_id>/", methods=["DELETE"])
 @auth_required
@@ -520,23 +813,88 @@ def unsave_room(current_user, room_id):
     """
     Remove a room from user's saved list.
     """
-    room = Room.query.get(room_id)
-    if not room:
-        return json.dumps({"error": "Room not found"}), 404
-    if room not in current_user.saved_rooms:
-        return json.dumps({"error": "Not in saved list"}), 400
-
-    current_user.saved_rooms.remove(room)
+    removed = db.session.execute(saved_rooms.delete().where(
+        saved_rooms.c.user_id == current_user.id,
+        saved_rooms.c.room_id == room_id,
+    )).rowcount
+    if not removed:
+        # tell "no such room" apart from "not saved"
+        if not db.session.query(db.exists().where(Room.id == room_id)).scalar():
+            return dumps({"error": "Room not found"}), 404
+        return dumps({"error": "Not in saved list"}), 400
+
+    bump(current_user.id, saved_rooms=-1)
     db.session.commit()
-    return json.dumps({"success": True}), 200
+    return dumps({"success": True}), 200
+
+
+@app.route("/api/users/me/saved_rooms/bulk/", methods=["POST"])
+@auth_required
+def bulk_saved_rooms(current_user):
+    """
+    Save and/or unsave many rooms in one transaction.
 
+    Body: {"save": [room_id, ...], "unsave": [room_id, ...]}
+    Per-room results mirror the single save/unsave endpoints.
+    """
+    try:
+        ids = parse_ids(request.get_json(force=True), ("save", "unsave"))
+    except ValueError as e:
+        return dumps({"error": str(e)}), 400
+
+    all_ids = ids["save"] + ids["unsave"]
+    # room id -> whether the caller may save it (listed, same gender)
+    rooms = {room_id: listed and gender == current_user.gender
+             for room_id, gender, listed in db.session.query(Room.id, Room.gender, User.is_room_listed)
+             .join(User, Room.owner)
+             .filter(Room.id.in_(all_ids))}
+    already = {room_id for (room_id,) in db.session.query(saved_rooms.c.room_id)
+               .filter(saved_rooms.c.user_id == current_user.id,
+                       saved_rooms.c.room_id.in_(all_ids))}
+    results, to_save, to_unsave = [], [], []
+
+    for room_id in ids["save"]:
+        if not rooms.get(room_id):
+            results.append(item_error(room_id, 404, "Room not found"))
+        elif room_id in already:
+            results.append(item_error(room_id, 400, "Already saved"))
+        else:
+            to_save.append(room_id)
+            results.append({"id": room_id, "status": 201})
+
+    for room_id in ids["unsave"]:
+        if room_id not in rooms:
+            results.append(item_error(room_id, 404, "Room not found"))
+        elif room_id not in already:
+            results.append(item_error(room_id, 400, "Not in saved list"))
+        else:
+            to_unsave.append(room_id)
+            results.append({"id": room_id, "status": 200})
+
+    # Count what the statements actually changed: a concurrent request may
+    # have saved or unsaved some of these rooms since `already` was read.
+    saved = unsaved = 0
+    if to_save:
+        saved = db.session.execute(insert_ignoring_duplicates(saved_rooms).values(
+            [{"user_id": current_user.id, "room_id": r} for r in to_save]
+        )).rowcount
+    if to_unsave:
+        unsaved = db.session.execute(saved_rooms.delete().where(
+            saved_rooms.c.user_id == current_user.id,
+            saved_rooms.c.room_id.in_(to_unsave),
+        )).rowcount
+    bump(current_user.id, saved_rooms=saved - unsaved)
+    db.session.commit()
+    return dumps(bulk_response(results)), 200
 
-_FEATURE_CACHE: dict[str, list[str]] = {}
 @app.route("/api/dorm_features/", methods=["GET"])
 @auth_required
+@cached("dorm_features", ttl=300, key=lambda user: None)
 def dorm_features(current_user):
     """
     Return a JSON object mapping dorm‑slug → list[feature].
+    Served from the dorm_features table, which the background
+    refresher keeps up to date; never scrapes inside the request.
 
     Example response:
     {
@@ -544,26 +902,67 @@ def dorm_features(current_user):
         "Alice Cook House": [...],
     }
     """
-    result = {}
-
-    for slug, url in DORM_URLS.items():
-        if slug in _FEATURE_CACHE:
-            result[slug] = _FEATURE_CACHE[slug]
-            continue
+    return dumps(load_all()), 200
 
-        try:
-            feats = scrape_community_features(url)
-        except Exception as exc:
-            feats = []
-        _FEATURE_CACHE[slug] = feats
-        result[slug] = feats
+# Admin
+@app.route("/api/admin/metrics/", methods=["GET"])
+@auth_required
+def admin_metrics(current_user):
+    """
+    Per-endpoint latency, DB time and query-count histograms.
+    Only for emails listed in ADMIN_EMAILS; empty unless QUERY_METRICS=1.
+    """
+    if current_user.email.lower() not in ADMIN_EMAILS:
+        return dumps({"error": "Not authorized"}), 403
+    return dumps({
+        "enabled": QUERY_METRICS,
+        "endpoints": metrics.snapshot(),
+        "auth_cache": auth_cache.stats(),
+        "response_cache": {"hits": response_cache.hits, "misses": response_cache.misses},
+        "events": bus.stats(),
+    }), 200
 
-    return json.dumps(result), 200
+# Events
+@app.route("/api/events/", methods=["GET"])
+@auth_required
+def event_stream(current_user):
+    """
+    Server-Sent Events for knocks the caller sent or received:
+    knock.created, knock.accepted, knock.deleted, plus resync when
+    events were dropped. Replaces polling the knock lists.
+    """
+    sub = bus.subscribe(current_user.id)
+    if request.environ.get(ASYNC_STREAMS_KEY):
+        # asgi.py streams the body on its event loop, holding no thread,
+        # and unsubscribes once the stream ends
+        request.environ[SUBSCRIPTION_KEY] = sub
+        body = None
+    else:
+        body = sse_stream(sub)
+    resp = Response(body, mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+    if body is not None:
+        # the server closes the response even if the body never started
+        resp.call_on_close(lambda: bus.unsubscribe(sub))
+    return resp
+
+# Errors
+@app.errorhandler(HTTPException)
+def http_error(e):
+    """
+    Flask's own 404/405/... responses as JSON in the views' error shape.
+    """
+    resp = e.get_response()
+    resp.data = dumps({"error": e.name})
+    resp.content_type = "application/json"
+    return resp
 
 # Dummy Route
 @app.route("/api/", methods=["GET"])
 def hello():
-    return json.dumps({"message": "Welcome to the DormHop API"}), 200
+    return dumps({"message": "Welcome to the DormHop API"}), 200
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000, debug=True)
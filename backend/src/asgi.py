@@ -0,0 +1,153 @@
+"""
+Production entry point: the DormHop API as an ASGI application.
+
+    uvicorn asgi:application --host 0.0.0.0 --port 5000 --workers 4
+
+Requests are served by a2wsgi's WSGIMiddleware, which runs the Flask
+views in a bounded thread pool (ASGI_THREADS per process), so a slow
+request ties up one pool thread, never the event loop or the whole
+worker. /api/events/ streams still authenticate and subscribe in that
+pool, but their long-lived body is written from the event loop: an open
+stream costs a coroutine instead of a thread, and one process can hold
+thousands of them.
+
+`python app.py` remains the development server.
+"""
+from __future__ import annotations
+import asyncio
+import os
+from contextlib import suppress
+
+from a2wsgi import WSGIMiddleware
+from a2wsgi.wsgi import Body, build_environ
+
+from app import app
+from events import ASYNC_STREAMS_KEY, SUBSCRIPTION_KEY, bus, sse_stream_async
+
+# default matches the default DB pool (DB_POOL_SIZE + DB_MAX_OVERFLOW)
+THREADS = int(os.environ.get("ASGI_THREADS", 30))
+
+EVENTS_PATH = "/api/events/"
+
+
+class DormHopASGI:
+    """
+    A WSGI app over ASGI. Everything but GET /api/events/ goes through
+    WSGIMiddleware; event streams are handed to the loop once the view
+    has subscribed (see app.event_stream).
+    """
+    def __init__(self, wsgi_app, threads: int = THREADS):
+        self.wsgi_app = _input_terminated(wsgi_app)
+        self.middleware = WSGIMiddleware(self.wsgi_app, workers=threads)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            send = _without_app_date(send)
+            if scope["path"] == EVENTS_PATH and scope["method"] == "GET":
+                await self._events(scope, receive, send)
+                return
+        await self.middleware(scope, receive, send)
+
+    async def _events(self, scope, receive, send):
+        loop = asyncio.get_running_loop()
+        environ = build_environ(scope, Body(loop, receive))
+        environ[ASYNC_STREAMS_KEY] = True
+        call = self.middleware.executor.submit(self._call_app, environ)
+        try:
+            status, headers, body = await asyncio.wrap_future(call)
+            sub = environ.get(SUBSCRIPTION_KEY)
+            if sub is None:
+                # not subscribed (bad token, ...): an ordinary response
+                await send({"type": "http.response.start", "status": status, "headers": headers})
+                await send({"type": "http.response.body", "body": body})
+                return
+            # the placeholder body was empty; the stream has no length
+            headers = [(k, v) for k, v in headers if k != b"content-length"]
+            await self._stream_events(sub, status, headers, receive, send)
+        finally:
+            # the subscription is ours however this ends. The callback runs
+            # once the view's thread is done: if we were cancelled while it
+            # ran, it may still have subscribed after that
+            call.add_done_callback(lambda _: _unsubscribe(environ))
+
+    def _call_app(self, environ) -> tuple[int, list, bytes]:
+        """
+        In a pool thread: (status, headers, body) of the app's response.
+        """
+        response = []
+
+        def start_response(status, headers, exc_info=None):
+            response[:] = [int(status.split(" ", 1)[0]),
+                           [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers]]
+
+        chunks = self.wsgi_app(environ, start_response)
+        try:
+            body = b"".join(chunks)
+        finally:
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
+        return response[0], response[1], body
+
+    async def _stream_events(self, sub, status, headers, receive, send):
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        frames = sse_stream_async(sub)
+        gone = asyncio.ensure_future(self._disconnected(receive))
+        try:
+            while True:
+                frame = asyncio.ensure_future(frames.__anext__())
+                await asyncio.wait({frame, gone}, return_when=asyncio.FIRST_COMPLETED)
+                if not frame.done():
+                    # client went away while the stream was idle
+                    frame.cancel()
+                    with suppress(asyncio.CancelledError, StopAsyncIteration):
+                        await frame
+                    return
+                try:
+                    data = frame.result()
+                except StopAsyncIteration:
+                    # max stream length reached; the client reconnects
+                    await send({"type": "http.response.body", "body": b""})
+                    return
+                await send({"type": "http.response.body", "body": data.encode(), "more_body": True})
+        finally:
+            gone.cancel()
+            await frames.aclose()
+
+    @staticmethod
+    async def _disconnected(receive):
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+
+def _unsubscribe(environ):
+    sub = environ.pop(SUBSCRIPTION_KEY, None)
+    if sub is not None:
+        bus.unsubscribe(sub)
+
+
+def _input_terminated(wsgi_app):
+    """
+    a2wsgi's wsgi.input ends with the request body, chunked or not; say so,
+    or Werkzeug reads a body without Content-Length as empty.
+    """
+    def wrapped(environ, start_response):
+        environ.setdefault("wsgi.input_terminated", True)
+        return wsgi_app(environ, start_response)
+    return wrapped
+
+
+def _without_app_date(send):
+    """
+    Drop the Date header Werkzeug sets on some responses (make_conditional
+    in http_cache): the ASGI server adds its own, and two are invalid.
+    """
+    async def wrapped(message):
+        if message["type"] == "http.response.start":
+            message = {**message,
+                       "headers": [(k, v) for k, v in message["headers"] if k != b"date"]}
+        await send(message)
+    return wrapped
+
+
+application = DormHopASGI(app)
@@ -0,0 +1,174 @@
+from __future__ import annotations
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from itertools import chain
+
+from sqlalchemy import event
+
+from db import User, Room
+
+CLAIMS_TTL   = int(os.environ.get("AUTH_CLAIMS_TTL", 300))
+USER_TTL     = int(os.environ.get("AUTH_USER_TTL", 30))
+MAX_ENTRIES  = int(os.environ.get("AUTH_CACHE_MAX_ENTRIES", 10_000))
+
+# Columns a view can read without touching the database
+SNAPSHOT_FIELDS = ("id", "email", "full_name", "class_year", "gender", "is_room_listed")
+UserSnapshot = namedtuple("UserSnapshot", SNAPSHOT_FIELDS + ("profile",))
+
+
+class TTLCache:
+    """
+    Thread-safe LRU with a per-entry deadline (time.time() based).
+    """
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[1] <= time.time():
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def put(self, key, value, deadline: float):
+        with self._lock:
+            self._data[key] = (value, deadline)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+class CurrentUser:
+    """
+    What @auth_required hands to views.
+
+    Reads of SNAPSHOT_FIELDS and serialize() are answered from the cached
+    snapshot. Anything else (relationships, writes) loads the real User
+    row once and delegates to it from then on, so views can treat this
+    exactly like a User.
+    """
+    __slots__ = ("_snapshot", "_user")
+
+    def __init__(self, snapshot: UserSnapshot):
+        object.__setattr__(self, "_snapshot", snapshot)
+        object.__setattr__(self, "_user", None)
+
+    def _load(self) -> User:
+        user = object.__getattribute__(self, "_user")
+        if user is None:
+            user = User.query.get(object.__getattribute__(self, "_snapshot").id)
+            object.__setattr__(self, "_user", user)
+        return user
+
+    def __getattr__(self, name):
+        user = object.__getattribute__(self, "_user")
+        if user is None and name in SNAPSHOT_FIELDS:
+            return getattr(object.__getattribute__(self, "_snapshot"), name)
+        return getattr(self._load(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._load(), name, value)
+
+    def serialize(self) -> dict:
+        if object.__getattribute__(self, "_user") is None:
+            return dict(object.__getattribute__(self, "_snapshot").profile)
+        return self._load().serialize()
+
+
+class AuthCache:
+    """
+    Caches verified JWT claims (keyed by token hash) and per-user
+    snapshots (keyed by user id) so an authenticated request can skip
+    both jwt.decode and the users SELECT.
+
+    Snapshots are dropped when a transaction touching the user or their
+    room commits in this process; other processes catch up within
+    USER_TTL seconds.
+    """
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.claims = TTLCache(max_entries)
+        self.users  = TTLCache(max_entries)
+
+    def claims_for(self, token: str, decode) -> dict | None:
+        key = hashlib.sha256(token.encode()).digest()
+        data = self.claims.get(key)
+        if data is None:
+            data = decode(token)
+            if not data:
+                return None
+            deadline = min(time.time() + CLAIMS_TTL, data.get("exp", float("inf")))
+            self.claims.put(key, data, deadline)
+        return data
+
+    def user_for(self, user_id: int) -> CurrentUser | None:
+        snapshot = self.users.get(user_id)
+        if snapshot is None:
+            user = User.query.get(user_id)
+            if not user:
+                return None
+            snapshot = UserSnapshot(
+                *(getattr(user, f) for f in SNAPSHOT_FIELDS), profile=user.serialize()
+            )
+            self.users.put(user_id, snapshot, time.time() + USER_TTL)
+            current = CurrentUser(snapshot)
+            object.__setattr__(current, "_user", user)
+            return current
+        return CurrentUser(snapshot)
+
+    def invalidate_user(self, user_id: int):
+        self.users.pop(user_id)
+
+    def stats(self) -> dict:
+        return {"claims": self.claims.stats(), "users": self.users.stats()}
+
+
+auth_cache = AuthCache()
+
+
+def invalidate_users_on_commit(session):
+    """
+    Drop the snapshot of every user whose row or room changed, once the
+    transaction commits.
+    """
+    @event.listens_for(session, "after_flush")
+    def _collect(sess, flush_context):
+        ids = sess.info.setdefault("auth_cache_users", set())
+        for obj in chain(sess.new, sess.dirty, sess.deleted):
+            if isinstance(obj, User):
+                ids.add(obj.id)
+            elif isinstance(obj, Room):
+                ids.add(obj.owner_id)
+
+    @event.listens_for(session, "after_commit")
+    def _apply(sess):
+        for user_id in sess.info.pop("auth_cache_users", ()):
+            auth_cache.invalidate_user(user_id)
+
+    @event.listens_for(session, "after_rollback")
+    def _discard(sess):
+        sess.info.pop("auth_cache_users", None)
@@ -0,0 +1,178 @@
+"""
+Synthetic DormHop dataset for load tests.
+
+Generates users, rooms, amenities, knocks and saved rooms with skewed,
+campus-like distributions: a few dorms hold most rooms, knocks and saves
+stay inside a gender pool and pile up on popular rooms, and ~70% of
+rooms are listed. The same --seed always produces the same rows.
+
+Usage (from backend/src):
+    python -m benchmarks.datagen --database-url sqlite:////tmp/bench.db --users 100000
+"""
+from __future__ import annotations
+import argparse
+import math
+import random
+import time
+from bisect import bisect
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+from sqlalchemy import create_engine
+
+from db import User, Room, Amenity, RoomAmenity, Knock, saved_rooms
+from seed_data import bulk_load
+from urls import DORM_URLS
+
+GENDERS     = {"male": 48, "female": 48, "other": 4}
+CLASS_YEARS = {2025: 20, 2026: 25, 2027: 27, 2028: 28}
+OCCUPANCY   = {1: 30, 2: 45, 3: 15, 4: 10}
+AMENITIES   = {"private bathroom": 10, "lake view": 4, "gorge view": 3, "big closet": 8,
+               "air conditioning": 6, "kitchenette": 3, "quiet floor": 5, "corner room": 4,
+               "near dining hall": 7, "elevator access": 5, "hardwood floors": 2, "balcony": 1}
+LISTED_SHARE   = 0.7
+ACCEPTED_SHARE = 0.15
+START          = datetime(2025, 1, 1)
+SPAN_SECONDS   = 90 * 24 * 3600
+
+
+class Popularity:
+    """
+    Weighted sampling over a fixed list of items (Zipf-like by default:
+    the item at rank r has weight 1 / r**s).
+    """
+    def __init__(self, items, weights=None, s: float = 1.0):
+        self.items = list(items)
+        weights = weights or [1 / (rank ** s) for rank in range(1, len(self.items) + 1)]
+        self.cum = list(accumulate(weights))
+
+    def pick(self, rng: random.Random):
+        return self.items[bisect(self.cum, rng.random() * self.cum[-1])]
+
+
+def _when(rng: random.Random) -> datetime:
+    return START + timedelta(seconds=int(rng.random() * SPAN_SECONDS))
+
+
+def dataset(n_users: int, knocks_per_user: float = 5, saved_per_user: float = 3,
+            seed: int = 42) -> list[tuple]:
+    """
+    (table, rows) pairs in insert order; rows are lazy iterables of
+    dicts. Consume them in order: they share one random stream.
+    """
+    rng = random.Random(seed)
+
+    dorms = list(DORM_URLS)
+    rng.shuffle(dorms)
+    dorm_pick = Popularity(dorms, s=0.8)
+    gender_pick = Popularity(GENDERS, list(GENDERS.values()))
+    year_pick = Popularity(CLASS_YEARS, list(CLASS_YEARS.values()))
+    occ_pick = Popularity(OCCUPANCY, list(OCCUPANCY.values()))
+    amenity_names = list(AMENITIES)
+    amenity_pick = Popularity(range(1, len(amenity_names) + 1), list(AMENITIES.values()))
+
+    genders = [gender_pick.pick(rng) for _ in range(n_users)]
+    listed = [rng.random() < LISTED_SHARE for _ in range(n_users)]
+    # user i owns room i; rooms a user may knock on/save: listed, same gender
+    pools: dict[str, list[int]] = {g: [] for g in GENDERS}
+    for uid in range(1, n_users + 1):
+        if listed[uid - 1]:
+            pools[genders[uid - 1]].append(uid)
+    for pool in pools.values():
+        rng.shuffle(pool)  # popularity rank within the pool
+    pool_picks = {g: Popularity(pool, s=0.7) for g, pool in pools.items() if pool}
+
+    def users():
+        for uid in range(1, n_users + 1):
+            created = _when(rng)
+            yield {"id": uid, "email": f"bench{uid}@cornell.edu", "full_name": f"Bench User {uid}",
+                   "class_year": year_pick.pick(rng), "gender": genders[uid - 1],
+                   "created_at": created, "is_room_listed": listed[uid - 1],
+                   "auto_reject_triple": False}
+
+    def rooms():
+        for uid in range(1, n_users + 1):
+            created = _when(rng)
+            yield {"id": uid, "dorm": dorm_pick.pick(rng), "room_number": str(rng.randint(100, 599)),
+                   "occupancy": occ_pick.pick(rng), "description": None, "owner_id": uid,
+                   "gender": genders[uid - 1], "created_at": created,
+                   "updated_at": created + timedelta(seconds=rng.randrange(86400 * 7))}
+
+    def room_amenities():
+        for uid in range(1, n_users + 1):
+            chosen = dict.fromkeys(amenity_pick.pick(rng) for _ in range(rng.randint(0, 4)))
+            for position, amenity_id in enumerate(chosen):
+                yield {"room_id": uid, "amenity_id": amenity_id, "position": position}
+
+    def edges(per_user: float):
+        """
+        (user, room) pairs: about `per_user` per user, same pool, no self
+        or duplicate pairs.
+        """
+        for uid in range(1, n_users + 1):
+            pick = pool_picks.get(genders[uid - 1])
+            if pick is None:
+                continue
+            # floor of an exponential is geometric; this rate makes its mean per_user
+            want = min(int(rng.expovariate(math.log1p(1 / per_user))) if per_user else 0,
+                       len(pick.items) - 1)
+            targets, tries = set(), 0
+            while len(targets) < want and tries < want * 4:
+                tries += 1
+                room_id = pick.pick(rng)
+                if room_id != uid:
+                    targets.add(room_id)
+            for room_id in targets:
+                yield uid, room_id
+
+    def knocks():
+        for uid, room_id in edges(knocks_per_user):
+            created = _when(rng)
+            accepted = created + timedelta(hours=rng.randint(1, 72)) \
+                if rng.random() < ACCEPTED_SHARE else None
+            yield {"from_user_id": uid, "to_room_id": room_id,
+                   "status": "accepted" if accepted else "pending", "created_at": created,
+                   "accepted_at": accepted, "updated_at": accepted or created}
+
+    def saved():
+        for uid, room_id in edges(saved_per_user):
+            yield {"user_id": uid, "room_id": room_id}
+
+    return [
+        (Amenity.__table__, ({"id": i, "name": n} for i, n in enumerate(amenity_names, 1))),
+        (User.__table__, users()),
+        (Room.__table__, rooms()),
+        (RoomAmenity.__table__, room_amenities()),
+        (Knock.__table__, knocks()),
+        (saved_rooms, saved()),
+    ]
+
+
+def generate(engine, n_users: int, knocks_per_user: float = 5, saved_per_user: float = 3,
+             seed: int = 42) -> dict[str, int]:
+    """
+    Fill an empty database (creating the schema if needed). Returns the
+    number of rows written per table.
+    """
+    return bulk_load(engine, dataset(n_users, knocks_per_user, saved_per_user, seed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database-url", required=True, help="an empty database to fill")
+    parser.add_argument("--users", type=int, default=100_000, help="users (one room each)")
+    parser.add_argument("--knocks-per-user", type=float, default=5)
+    parser.add_argument("--saved-per-user", type=float, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    written = generate(create_engine(args.database_url), args.users,
+                       args.knocks_per_user, args.saved_per_user, args.seed)
+    elapsed = time.perf_counter() - start
+    print(", ".join(f"{n:,} {table}" for table, n in written.items()),
+          f"in {elapsed:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Rows/sec and peak memory of the room feed: ORM entities vs column
+projection.
+
+Builds a throwaway SQLite database with synthetic listed rooms and
+amenities, then serializes the same rows both ways:
+
+    orm   eager(Room.query.join(User), "room_feed_joined") + serialize_with_owner()
+    lean  projections.room_cards_query() + room_cards()
+
+Each run starts from an empty session, like a request does. Both paths
+are checked to produce identical output.
+
+Usage (from backend/src):
+    python -m benchmarks.feed_rows [--users 20000] [--rows 5000]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from flask import Flask
+from sqlalchemy import text
+
+from benchmarks.query_plans import populate
+from db import db, User, Room
+from loaders import eager
+from projections import room_cards, room_cards_query
+
+AMENITIES = ["AC", "Private Bathroom", "Kitchen", "Desk", "Sink", "Lounge",
+             "Elevator", "Laundry", "Gym", "Music Room", "Bike Storage", "Study Room"]
+
+
+def add_amenities(engine, n_users: int):
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO amenities (id, name) VALUES (:id, :name)"),
+                     [{"id": i + 1, "name": name} for i, name in enumerate(AMENITIES)])
+        links = []
+        for room_id in range(1, n_users + 1):
+            picks = random.sample(range(1, len(AMENITIES) + 1), random.randint(0, 5))
+            links += [{"r": room_id, "a": a, "p": pos} for pos, a in enumerate(picks)]
+        conn.execute(text("INSERT INTO room_amenities (room_id, amenity_id, position)"
+                          " VALUES (:r, :a, :p)"), links)
+
+
+def orm_feed(limit: int) -> list[dict]:
+    rooms = (eager(Room.query.join(User), "room_feed_joined")
+             .filter(User.is_room_listed.is_(True))
+             .order_by(Room.updated_at.desc(), Room.id.desc())
+             .limit(limit)
+             .all())
+    return [r.serialize_with_owner() for r in rooms]
+
+
+def lean_feed(limit: int) -> list[dict]:
+    rows = (room_cards_query()
+            .filter(User.is_room_listed.is_(True))
+            .order_by(Room.updated_at.desc(), Room.id.desc())
+            .limit(limit)
+            .all())
+    return room_cards(rows)
+
+
+def measure(fn, limit: int, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        db.session.remove()
+        start = time.perf_counter()
+        out = fn(limit)
+        best = min(best, time.perf_counter() - start)
+
+    db.session.remove()
+    tracemalloc.start()
+    fn(limit)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return out, len(out) / best, peak / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--rows", type=int, nargs="+", default=[51, 1000, 5000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+        db.init_app(app)
+        with app.app_context():
+            db.create_all()
+            populate(db.engine, args.users, n_knocks=0)
+            add_amenities(db.engine, args.users)
+            with db.engine.begin() as conn:
+                conn.execute(text("ANALYZE"))
+
+            print(f"{'rows':>6} {'path':<5} {'rows/sec':>10} {'peak MiB':>9}")
+            for limit in args.rows:
+                orm_out, orm_rate, orm_peak = measure(orm_feed, limit, args.repeat)
+                lean_out, lean_rate, lean_peak = measure(lean_feed, limit, args.repeat)
+                same = "" if orm_out == lean_out else "  (output differs!)"
+                print(f"{limit:>6} {'orm':<5} {orm_rate:>10,.0f} {orm_peak:>9.2f}")
+                print(f"{limit:>6} {'lean':<5} {lean_rate:>10,.0f} {lean_peak:>9.2f}"
+                      f"   x{lean_rate / orm_rate:.1f}{same}")
+            db.session.remove()
+            db.engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
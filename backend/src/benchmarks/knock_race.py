@@ -0,0 +1,129 @@
+"""
+Concurrency stress test for send_knock.
+
+Each round, --threads threads knock at once on one fresh pair of users:
+half as A on B's room, half as B on A's room. Afterwards the pair must
+have exactly one knock per direction, both accepted (the mutual match
+was not missed), exactly one request must have reported the match, and
+every extra request must have been answered "Already knocked" instead
+of failing. Exits 1 on any violation.
+
+Usage (from backend/src):
+    python -m benchmarks.knock_race [--threads 16] [--rounds 50]
+    python -m benchmarks.knock_race --database-url postgresql://...   # default: temp SQLite
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--database-url", help="default: a temporary SQLite file")
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{tmp.name}/race.db"
+    os.environ.setdefault("SECRET_KEY", "knock-race")
+    os.environ.setdefault("GOOGLE_CLIENT_ID", "knock-race")
+    os.environ.setdefault("FEATURE_REFRESHER", "0")
+    from app import app, encode_token
+    from db import db, User, Room, Knock
+
+    run = uuid.uuid4().hex[:8]  # unique emails, so a shared database can be reused
+
+    def make_pair(r):
+        with app.app_context():
+            pair = []
+            for side in "ab":
+                user = User(email=f"race-{run}-{r}{side}@cornell.edu", full_name=f"Race {r}{side}",
+                            class_year=2027, gender="male")
+                user.is_room_listed = True
+                db.session.add(user)
+                db.session.flush()
+                room = Room(dorm="Balch Hall", room_number=f"{r}{side}", occupancy=2,
+                            owner_id=user.id, gender="male")
+                db.session.add(room)
+                db.session.flush()
+                pair.append((user.id, room.id, encode_token(user)))
+            db.session.commit()
+            return pair
+
+    # three phases per round: main thread set up the pair / fire / done
+    barrier = threading.Barrier(args.threads + 1)
+    statuses, violations = Counter(), []
+    lock = threading.Lock()
+    jobs = [None] * args.threads
+    results = [{"a": [], "b": []} for _ in range(args.rounds)]
+
+    def worker(i):
+        client = app.test_client()
+        for r in range(args.rounds):
+            barrier.wait()
+            token, room_id, side = jobs[i]
+            barrier.wait()
+            resp = client.post("/api/knocks/", json={"to_room_id": room_id},
+                               headers={"Authorization": f"Bearer {token}"})
+            error = (resp.get_json(silent=True) or {}).get("error")
+            with lock:
+                statuses[resp.status_code] += 1
+                results[r][side].append((resp.status_code, error))
+            barrier.wait()
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(args.threads)]
+    for t in threads:
+        t.start()
+    start = time.perf_counter()
+    pairs = []
+    for r in range(args.rounds):
+        (ua, ra, ta), (ub, rb, tb) = pair = make_pair(r)
+        pairs.append(pair)
+        for i in range(args.threads):
+            jobs[i] = (ta, rb, "a") if i % 2 == 0 else (tb, ra, "b")
+        barrier.wait()
+        barrier.wait()
+        barrier.wait()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    with app.app_context():
+        for r, ((ua, ra, _), (ub, rb, _)) in enumerate(pairs):
+            knocks = Knock.query.filter(
+                ((Knock.from_user_id == ua) & (Knock.to_room_id == rb)) |
+                ((Knock.from_user_id == ub) & (Knock.to_room_id == ra))
+            ).all()
+            directions = Counter(k.from_user_id for k in knocks)
+            if directions != Counter({ua: 1, ub: 1}):
+                violations.append(f"round {r}: knocks per direction {dict(directions)}")
+            if any(k.status != "accepted" for k in knocks):
+                violations.append(f"round {r}: mutual knocks left {[k.status for k in knocks]}")
+            # the first knock is created (201), the second completes the match (200)
+            successes = sorted(s for answers in results[r].values() for s, _ in answers
+                               if s in (200, 201))
+            if successes != [200, 201]:
+                violations.append(f"round {r}: successful responses {successes}")
+            for side, answers in results[r].items():
+                created = [s for s, _ in answers if s in (200, 201)]
+                rejected = [s for s, e in answers if s == 400 and e == "Already knocked"]
+                if len(created) != 1 or len(created) + len(rejected) != len(answers):
+                    violations.append(f"round {r} side {side}: responses {answers}")
+
+    print(f"{args.rounds} rounds x {args.threads} threads in {elapsed:.1f} s; "
+          f"responses {dict(sorted(statuses.items()))}")
+    for v in violations[:20]:
+        print("  FAIL", v)
+    print(f"{len(violations)} violations")
+    tmp.cleanup()
+    sys.exit(1 if violations else 0)
+
+
+if __name__ == "__main__":
+    main()
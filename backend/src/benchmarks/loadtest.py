@@ -0,0 +1,251 @@
+"""
+Latency and throughput of the main endpoints under concurrent load.
+
+Each scenario (feed, recommendations, sending knocks, both knock lists)
+is driven by --concurrency threads for --duration seconds, as users
+sampled from the database. Tokens are minted with SECRET_KEY, so the
+server under test must use the same one. Without --url, requests go
+through Flask's test client in this process (no network, no server).
+
+Results can be saved with the commit they were measured on and compared
+across runs.
+
+Usage (from backend/src):
+    python -m benchmarks.datagen --database-url sqlite:////tmp/bench.db --users 100000
+    python -m benchmarks.loadtest run --database-url sqlite:////tmp/bench.db --out before.json
+    python -m benchmarks.loadtest run --database-url ... --url http://localhost:8000 --out after.json
+    python -m benchmarks.loadtest compare before.json after.json
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import random
+import subprocess
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+import jwt
+from sqlalchemy import create_engine, text
+
+from urls import DORM_URLS
+
+DORMS = list(DORM_URLS)
+
+# name -> (user, targets, rng) -> (method, path, json body)
+SCENARIOS = {
+    "list_rooms": lambda user, targets, rng: (
+        "GET", "/api/rooms/?limit=50"
+        + (f"&dorm={rng.choice(DORMS)}" if rng.random() < 0.3 else ""), None),
+    "recommend_rooms": lambda user, targets, rng: ("GET", "/api/recommendations/?limit=20", None),
+    "send_knock": lambda user, targets, rng: (
+        "POST", "/api/knocks/", {"to_room_id": rng.choice(targets[user["gender"]])}),
+    "knocks_sent": lambda user, targets, rng: ("GET", "/api/knocks/sent/", None),
+    "knocks_received": lambda user, targets, rng: ("GET", "/api/knocks/received/", None),
+}
+
+
+def sample_users(engine, n: int, secret: str) -> tuple[list[dict], dict[str, list[int]]]:
+    """
+    Up to n random users that have a room, each with a fresh token, plus
+    listed room ids per gender to knock on.
+    """
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT users.id, users.email, users.gender FROM users"
+            " JOIN rooms ON rooms.owner_id = users.id ORDER BY random() LIMIT :n"
+        ), {"n": n}).all()
+        targets = {}
+        for gender in {row.gender for row in rows}:
+            targets[gender] = [room_id for (room_id,) in conn.execute(text(
+                "SELECT rooms.id FROM rooms JOIN users ON users.id = rooms.owner_id"
+                " WHERE users.is_room_listed AND rooms.gender = :g ORDER BY random() LIMIT 5000"
+            ), {"g": gender})]
+    if not rows:
+        raise SystemExit("no users with rooms; fill the database with benchmarks.datagen first")
+    exp = datetime.now(timezone.utc) + timedelta(hours=6)
+    users = [{"id": row.id, "gender": row.gender, "token": jwt.encode(
+        {"user_id": row.id, "email": row.email, "exp": exp}, secret, algorithm="HS256")}
+        for row in rows]
+    return users, {g: ids or [0] for g, ids in targets.items()}
+
+
+class InProcessClient:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, body, token) -> int:
+        return self.client.open(path, method=method, json=body,
+                                headers={"Authorization": f"Bearer {token}"}).status_code
+
+
+class HTTPClient:
+    def __init__(self, base_url: str):
+        import requests
+        self.base_url = base_url.rstrip("/")
+        self.session = requests.Session()
+
+    def request(self, method, path, body, token) -> int:
+        return self.session.request(method, self.base_url + path, json=body, timeout=30,
+                                    headers={"Authorization": f"Bearer {token}"}).status_code
+
+
+def run_scenario(name, make_client, users, targets, concurrency: int, duration: float,
+                 warmup: int, seed: int) -> dict:
+    build = SCENARIOS[name]
+    latencies, statuses, lock = [], Counter(), threading.Lock()
+    deadline = [0.0]
+
+    def start_clock():
+        deadline[0] = time.perf_counter() + duration
+
+    # the clock starts once every thread has warmed up
+    ready = threading.Barrier(concurrency, action=start_clock)
+
+    def worker(i):
+        rng = random.Random(seed * 1000 + i)
+        client = make_client()
+        mine, codes = [], Counter()
+        for _ in range(warmup):
+            user = rng.choice(users)
+            method, path, body = build(user, targets, rng)
+            client.request(method, path, body, user["token"])
+        ready.wait()
+        while time.perf_counter() < deadline[0]:
+            user = rng.choice(users)
+            method, path, body = build(user, targets, rng)
+            start = time.perf_counter()
+            try:
+                status = client.request(method, path, body, user["token"])
+            except Exception:
+                status = "exception"
+            mine.append(time.perf_counter() - start)
+            codes[status] += 1
+        with lock:
+            latencies.extend(mine)
+            statuses.update(codes)
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - (deadline[0] - duration)
+
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+    errors = sum(n for code, n in statuses.items() if code == "exception" or code >= 500)
+    return {
+        "requests": len(latencies),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(pct(0.50), 2),
+        "p95_ms": round(pct(0.95), 2),
+        "p99_ms": round(pct(0.99), 2),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2),
+        "errors": errors,
+        "statuses": {str(code): n for code, n in sorted(statuses.items(), key=str)},
+    }
+
+
+def git_revision() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                                    capture_output=True, text=True).stdout.strip())
+        return {"commit": commit, "dirty": dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+
+
+def print_table(results: dict):
+    print(f"{'scenario':<18}{'requests':>9}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}"
+          f"{'p99 ms':>9}{'errors':>8}  statuses")
+    for name, r in results.items():
+        print(f"{name:<18}{r['requests']:>9}{r['rps']:>9}{r['p50_ms']:>9}{r['p95_ms']:>9}"
+              f"{r['p99_ms']:>9}{r['errors']:>8}  {r['statuses']}")
+
+
+def cmd_run(args):
+    os.environ["DATABASE_URL"] = args.database_url
+    secret = os.environ.setdefault("SECRET_KEY", "loadtest")
+    users, targets = sample_users(create_engine(args.database_url), args.sample_users, secret)
+
+    if args.url:
+        make_client = lambda: HTTPClient(args.url)
+    else:
+        os.environ.setdefault("GOOGLE_CLIENT_ID", "loadtest")
+        os.environ.setdefault("FEATURE_REFRESHER", "0")
+        from app import app
+        make_client = lambda: InProcessClient(app)
+
+    names = args.scenarios or list(SCENARIOS)
+    results = {}
+    for name in names:
+        results[name] = run_scenario(name, make_client, users, targets, args.concurrency,
+                                     args.duration, args.warmup, args.seed)
+        print(f"{name}: {results[name]['rps']} req/s, p99 {results[name]['p99_ms']} ms")
+
+    print()
+    print_table(results)
+    if args.out:
+        report = {
+            **git_revision(),
+            "measured_at": datetime.now(timezone.utc).isoformat(),
+            "target": args.url or "in-process",
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "users_sampled": len(users),
+            "scenarios": results,
+        }
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nwrote {args.out}")
+
+
+def cmd_compare(args):
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    label = lambda r: f"{r.get('commit')}{'+dirty' if r.get('dirty') else ''}"
+    print(f"{label(base)} -> {label(new)}  (negative latency / positive rps change is better)")
+    print(f"{'scenario':<18}{'metric':>8}{'base':>10}{'new':>10}{'change':>9}")
+    for name in [n for n in base["scenarios"] if n in new["scenarios"]]:
+        for metric in ("rps", "p50_ms", "p95_ms", "p99_ms"):
+            a, b = base["scenarios"][name][metric], new["scenarios"][name][metric]
+            change = f"{(b - a) / a:+.0%}" if a else "n/a"
+            print(f"{name:<18}{metric:>8}{a:>10}{b:>10}{change:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="load the endpoints and report latency / throughput")
+    run.add_argument("--database-url", required=True,
+                     help="database the server uses (to sample users and rooms)")
+    run.add_argument("--url", help="base URL of a running server; default: in process")
+    run.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS))
+    run.add_argument("--concurrency", type=int, default=8)
+    run.add_argument("--duration", type=float, default=10, help="seconds per scenario")
+    run.add_argument("--warmup", type=int, default=5, help="unrecorded requests per thread")
+    run.add_argument("--sample-users", type=int, default=1000)
+    run.add_argument("--seed", type=int, default=42)
+    run.add_argument("--out", help="write results (with the git commit) as JSON")
+    run.set_defaults(func=cmd_run)
+
+    compare = sub.add_parser("compare", help="compare two saved runs")
+    compare.add_argument("base")
+    compare.add_argument("new")
+    compare.set_defaults(func=cmd_compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
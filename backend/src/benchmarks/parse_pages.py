@@ -0,0 +1,124 @@
+"""
+Parse time and memory per dorm page for each scraper parser backend.
+
+Runs scraper.parse_community_features over saved copies of the dorm
+pages with every (parser, main_only) combination, checks they all
+extract the same features, and reports the best-of-N time and the peak
+traced allocation per page.
+
+Usage (from backend/src):
+    python -m benchmarks.parse_pages --save pages/     # download once (network)
+    python -m benchmarks.parse_pages --pages pages/
+    python -m benchmarks.parse_pages --synthetic 25    # offline stand-in pages
+"""
+import argparse
+import pathlib
+import re
+import time
+import tracemalloc
+
+import requests
+
+from scraper import HEADERS, parse_community_features
+from urls import DORM_URLS
+
+VARIANTS = [
+    ("html.parser", False),
+    ("html.parser", True),
+    ("lxml", False),
+    ("lxml", True),
+]
+
+
+def slugify(name: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", name.lower()).strip("_")
+
+
+def save_pages(directory: pathlib.Path):
+    directory.mkdir(parents=True, exist_ok=True)
+    with requests.Session() as session:
+        for name, url in DORM_URLS.items():
+            try:
+                resp = session.get(url, headers=HEADERS, timeout=10)
+                resp.raise_for_status()
+            except requests.RequestException as exc:
+                print(f"❌ {name}: {exc}")
+                continue
+            (directory / f"{slugify(name)}.html").write_text(resp.text, encoding="utf-8")
+            print(f"✅ {name}")
+
+
+def synthetic_page(i: int) -> str:
+    """
+    A page shaped like the housing site: heavy nav/footer around a short
+    <main> with the features heading.
+    """
+    nav = "".join(f'<li><a href="/x/{j}">Link {j}</a><ul><li>Sub {j}</li></ul></li>'
+                  for j in range(400))
+    footer = "".join(f"<p>Footer paragraph {j} with <a href='#'>a link</a>.</p>"
+                     for j in range(300))
+    body = "".join(f"<h4>Section {j}</h4><p>Filler text {j}.</p>" for j in range(20))
+    return (
+        f"<html><head><title>Hall {i}</title></head><body>"
+        f"<header><nav><h2>Menu</h2><ul>{nav}</ul></nav></header>"
+        f"<main><h1>Hall {i}</h1>{body}<h3>Community Features:</h3>"
+        f"<p>Open to first-year students<br>{200 + i}+ residents</p>"
+        f"<ul><li>Kitchen</li><li>Music room</li><li>Lounge {i}</li></ul></main>"
+        f"<footer>{footer}</footer></body></html>"
+    )
+
+
+def measure(pages: list[str], parser: str, main_only: bool, repeat: int):
+    results = [parse_community_features(html, parser, main_only) for html in pages]
+
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for html in pages:
+            parse_community_features(html, parser, main_only)
+        best = min(best, time.perf_counter() - start)
+
+    peaks = []
+    for html in pages:
+        tracemalloc.start()
+        parse_community_features(html, parser, main_only)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    return results, best / len(pages) * 1000, max(peaks) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=pathlib.Path, help="directory of saved .html pages")
+    parser.add_argument("--save", type=pathlib.Path, help="download DORM_URLS into this directory")
+    parser.add_argument("--synthetic", type=int, default=0, help="use N generated pages")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.save:
+        save_pages(args.save)
+        return
+    if args.pages:
+        pages = [p.read_text(encoding="utf-8") for p in sorted(args.pages.glob("*.html"))]
+    elif args.synthetic:
+        pages = [synthetic_page(i) for i in range(args.synthetic)]
+    else:
+        parser.error("give --pages DIR, --save DIR or --synthetic N")
+    if not pages:
+        parser.error("no pages to parse")
+
+    avg_kb = sum(len(p) for p in pages) / len(pages) / 1024
+    print(f"{len(pages)} pages, {avg_kb:.0f} KiB average\n")
+    print(f"{'parser':<12} {'main only':<10} {'ms/page':>9} {'peak KiB':>10}")
+
+    baseline = None
+    for name, main_only in VARIANTS:
+        results, ms, peak_kb = measure(pages, name, main_only, args.repeat)
+        same = "" if baseline is None or results == baseline else "  (features differ!)"
+        baseline = baseline or results
+        print(f"{name:<12} {str(main_only):<10} {ms:>9.2f} {peak_kb:>10.0f}{same}")
+
+
+if __name__ == "__main__":
+    main()
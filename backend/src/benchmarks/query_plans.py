@@ -0,0 +1,223 @@
+"""
+Query plans and timings for the hot paths, without and with the indexes
+declared in db.py.
+
+Builds a throwaway SQLite database, fills it with synthetic users, rooms
+and knocks, then runs each hot query with every secondary index dropped
+("before") and again after creating them ("after").
+
+With --query-counts, instead checks that the list endpoints run a fixed
+number of statements: each is requested through the app with 1 and then
+--rows rows in its result, and any endpoint whose count grows with the
+rows (a per-row lazy load) fails the run with exit status 1.
+
+Usage (from backend/src):
+    python -m benchmarks.query_plans [--users 20000] [--knocks 100000]
+    python -m benchmarks.query_plans --query-counts [--rows 25]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine, text
+
+from db import db
+
+# (name, SQL, parameter factory) for every hot path in app.py
+HOT_QUERIES = [
+    ("feed page (list_rooms)",
+     "SELECT rooms.id FROM rooms JOIN users ON users.id = rooms.owner_id "
+     "WHERE users.is_room_listed = 1 AND users.gender = :gender AND rooms.gender = :gender "
+     "AND users.id != :uid ORDER BY rooms.updated_at DESC, rooms.id DESC LIMIT 51",
+     lambda n: {"gender": random.choice(["male", "female"]), "uid": random.randint(1, n)}),
+    ("feed page, gender 'other' (list_rooms)",
+     "SELECT rooms.id FROM rooms JOIN users ON users.id = rooms.owner_id "
+     "WHERE users.is_room_listed = 1 AND users.id != :uid "
+     "ORDER BY rooms.updated_at DESC, rooms.id DESC LIMIT 51",
+     lambda n: {"uid": random.randint(1, n)}),
+    ("room of user (User.room)",
+     "SELECT id FROM rooms WHERE owner_id = :uid",
+     lambda n: {"uid": random.randint(1, n)}),
+    ("duplicate knock (send_knock)",
+     "SELECT id FROM knocks WHERE from_user_id = :uid AND to_room_id = :rid",
+     lambda n: {"uid": random.randint(1, n), "rid": random.randint(1, n)}),
+    ("reciprocal knock (send_knock)",
+     "SELECT id FROM knocks WHERE from_user_id = :uid AND to_room_id = :rid AND status = 'pending'",
+     lambda n: {"uid": random.randint(1, n), "rid": random.randint(1, n)}),
+    ("knocks sent (list_sent_knocks)",
+     "SELECT id FROM knocks WHERE from_user_id = :uid",
+     lambda n: {"uid": random.randint(1, n)}),
+    ("knocks received (list_received_knocks)",
+     "SELECT knocks.id FROM knocks JOIN rooms ON rooms.id = knocks.to_room_id "
+     "WHERE rooms.owner_id = :uid",
+     lambda n: {"uid": random.randint(1, n)}),
+]
+
+
+def populate(engine, n_users: int, n_knocks: int):
+    genders = ["male", "female", "other"]
+    dorms = ["Balch Hall", "Mews Hall", "Clara Dickson Hall", "High Rise 5", "Low Rise 7"]
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO users (id, email, full_name, class_year, gender, created_at,"
+            " is_room_listed, auto_reject_triple)"
+            " VALUES (:id, :email, 'Bench User', 2027, :gender, '2025-01-01 00:00:00', :listed, 0)"
+        ), [{"id": i, "email": f"u{i}@cornell.edu",
+             "gender": random.choices(genders, weights=[48, 48, 4])[0],
+             "listed": random.random() < 0.7} for i in range(1, n_users + 1)])
+        conn.execute(text(
+            "INSERT INTO rooms (id, dorm, room_number, occupancy, owner_id, gender,"
+            " created_at, updated_at)"
+            " SELECT id, :dorm, CAST(id AS TEXT), 2, id, gender,"
+            " '2025-01-01 00:00:00', datetime('2025-01-01', '+' || id || ' seconds')"
+            " FROM users"
+        ), {"dorm": random.choice(dorms)})
+        pairs = {(random.randint(1, n_users), random.randint(1, n_users))
+                 for _ in range(n_knocks)}
+        if not pairs:
+            return
+        conn.execute(text(
+            "INSERT INTO knocks (from_user_id, to_room_id, status, created_at)"
+            " VALUES (:f, :t, :s, '2025-01-01 00:00:00')"
+        ), [{"f": f, "t": t, "s": random.choice(["pending", "pending", "accepted"])}
+            for f, t in pairs if f != t])
+
+
+def report(engine, n_users: int, label: str, repeat: int):
+    print(f"\n=== {label} ===")
+    with engine.connect() as conn:
+        for name, sql, params in HOT_QUERIES:
+            plan = conn.execute(text("EXPLAIN QUERY PLAN " + sql), params(n_users)).all()
+            start = time.perf_counter()
+            for _ in range(repeat):
+                conn.execute(text(sql), params(n_users)).all()
+            per_query = (time.perf_counter() - start) / repeat * 1000
+            print(f"\n{name}: {per_query:.3f} ms/query")
+            for row in plan:
+                print(f"    {row[-1]}")
+
+
+# (endpoint, key of the result list) checked by --query-counts
+COUNTED_ENDPOINTS = [
+    ("/api/rooms/", "rooms"),
+    ("/api/users/me/saved_rooms/", "saved_rooms"),
+    ("/api/users/me/saved_rooms/?limit=100", "saved_rooms"),
+    ("/api/knocks/sent/", "knocks"),
+    ("/api/knocks/received/", "knocks"),
+]
+
+
+def _grow(viewer, n: int):
+    """
+    Add listed rooms until the viewer's feed holds `n`, each saved by the
+    viewer, knocked on by the viewer and knocking on the viewer's room.
+    """
+    from db import db, User, Room, Knock
+
+    for i in range(Room.query.count() - 1, n):
+        other = User(email=f"qc{i}@cornell.edu", full_name=f"Query Count {i}",
+                     class_year=2027, gender=viewer.gender, is_room_listed=True)
+        db.session.add(other)
+        db.session.flush()
+        other.room = Room(dorm="Balch Hall", room_number=str(100 + i), occupancy=2,
+                          amenities=["lake view", f"amenity {i % 3}"],
+                          owner_id=other.id, gender=other.gender)
+        db.session.flush()
+        viewer.saved_rooms.append(other.room)
+        db.session.add_all([Knock(from_user_id=viewer.id, to_room_id=other.room.id),
+                            Knock(from_user_id=other.id, to_room_id=viewer.room.id)])
+    db.session.commit()
+
+
+def check_query_counts(rows: int) -> bool:
+    """
+    Statements per COUNTED_ENDPOINTS request at 1 and `rows` result rows.
+    Returns False if any endpoint's count depends on the row count.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'counts.db')}"
+        os.environ.setdefault("SECRET_KEY", "query-counts")
+        os.environ.setdefault("GOOGLE_CLIENT_ID", "query-counts")
+        os.environ.setdefault("FEATURE_REFRESHER", "0")
+        from app import app, encode_token
+        from db import db, User, Room
+        from http_cache import response_cache
+        from loaders import count_queries
+
+        client = app.test_client()
+        counts = {path: [] for path, _ in COUNTED_ENDPOINTS}
+        with app.app_context():
+            viewer = User(email="viewer@cornell.edu", full_name="Viewer", class_year=2027,
+                          gender="male", is_room_listed=True)
+            db.session.add(viewer)
+            db.session.flush()
+            viewer.room = Room(dorm="Mews Hall", room_number="1", occupancy=2,
+                               amenities=["lake view"], owner_id=viewer.id, gender="male")
+            db.session.commit()
+            headers = {"Authorization": f"Bearer {encode_token(viewer)}"}
+
+            for n in (1, rows):
+                _grow(viewer, n)
+                for path, key in COUNTED_ENDPOINTS:
+                    client.get(path, headers=headers)  # warm the auth cache
+                    response_cache.clear()
+                    with count_queries(db.engine) as q:
+                        resp = client.get(path, headers=headers)
+                    got = len(resp.get_json()[key])
+                    if resp.status_code != 200 or got != n:
+                        raise SystemExit(f"{path}: expected {n} rows, got "
+                                         f"{resp.status_code} with {got}")
+                    counts[path].append(q.count)
+            db.session.remove()
+            db.engine.dispose()
+
+    print(f"{'endpoint':<40}{'1 row':>8}{f'{rows} rows':>10}")
+    ok = True
+    for path, (one, many) in counts.items():
+        flag = "" if one == many else "   <-- grows with rows"
+        ok = ok and one == many
+        print(f"{path:<40}{one:>8}{many:>10}{flag}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--knocks", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--query-counts", action="store_true",
+                        help="check statements per list request instead of timing queries")
+    parser.add_argument("--rows", type=int, default=25,
+                        help="result rows for the larger --query-counts run")
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    if args.query_counts:
+        sys.exit(0 if check_query_counts(args.rows) else 1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        db.metadata.create_all(engine)
+        indexes = [ix for table in db.metadata.sorted_tables for ix in table.indexes]
+        for ix in indexes:
+            ix.drop(engine)
+
+        populate(engine, args.users, args.knocks)
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE"))
+        report(engine, args.users, "before: primary keys only", args.repeat)
+
+        for ix in indexes:
+            ix.create(engine)
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE"))
+        report(engine, args.users, "after: db.py indexes", args.repeat)
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
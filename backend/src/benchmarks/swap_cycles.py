@@ -0,0 +1,95 @@
+"""
+Swap-cycle search on synthetic knock graphs.
+
+Users are split into clusters (think dorm + gender pools) and knock on
+rooms in their own cluster, favouring popular rooms. Knocks are fed to a
+matching.KnockGraph one at a time; after each one the incremental check
+looks for cycles it closes, as send_knock does. Then the batch mode
+enumerates every cycle and picks user-disjoint swaps.
+
+Usage (from backend/src):
+    python -m benchmarks.swap_cycles [--users 10000 50000] [--knocks-per-user 5]
+"""
+import argparse
+import random
+import time
+
+from matching import KnockGraph, solve
+
+
+def synthetic_knocks(n_users: int, per_user: int, cluster: int, skew: float):
+    """
+    (knock_id, from_user, room_id, owner) tuples; user i owns room i.
+    """
+    knocks, knock_id = [], 0
+    for user in range(1, n_users + 1):
+        base = (user - 1) // cluster * cluster + 1
+        size = min(cluster, n_users - base + 1)
+        targets = set()
+        while len(targets) < min(per_user, size - 1):
+            # paretovariate: a few rooms in each cluster draw most knocks
+            target = base + min(int(random.paretovariate(skew)) - 1, size - 1)
+            if random.random() < 0.5:
+                target = random.randint(base, base + size - 1)
+            if target != user:
+                targets.add(target)
+        for target in targets:
+            knock_id += 1
+            knocks.append((knock_id, user, target, target))
+    random.shuffle(knocks)
+    return knocks
+
+
+def run(n_users: int, per_user: int, cluster: int, skew: float, max_length: int):
+    knocks = synthetic_knocks(n_users, per_user, cluster, skew)
+    graph = KnockGraph()
+    graph.built_at = time.monotonic()
+
+    timings, closing = [], 0
+    for knock_id, from_user, room_id, owner in knocks:
+        graph.add_knock(knock_id, from_user, room_id, owner)
+        start = time.perf_counter()
+        if graph.cycles_through(from_user, owner, max_length):
+            closing += 1
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+
+    start = time.perf_counter()
+    cycles = graph.all_cycles(max_length)
+    enumerate_s = time.perf_counter() - start
+    start = time.perf_counter()
+    chosen = solve(cycles)
+    solve_s = time.perf_counter() - start
+
+    by_len = {}
+    for cycle in cycles:
+        by_len[len(cycle)] = by_len.get(len(cycle), 0) + 1
+    matched = sum(len(c) for c in chosen)
+
+    print(f"\n{n_users:,} users, {len(knocks):,} pending knocks, cycles up to {max_length}")
+    print(f"  incremental: mean {sum(timings) / len(timings) * 1e6:.0f} µs, "
+          f"p99 {timings[int(len(timings) * 0.99)] * 1e6:.0f} µs, "
+          f"max {timings[-1] * 1e3:.1f} ms per knock; {closing:,} knocks closed a cycle")
+    print(f"  batch: {len(cycles):,} cycles {dict(sorted(by_len.items()))} "
+          f"in {enumerate_s * 1e3:.0f} ms; solve {solve_s * 1e3:.0f} ms")
+    print(f"  solution: {len(chosen):,} swaps moving {matched:,} users "
+          f"({matched / n_users:.1%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, nargs="+", default=[10_000, 50_000])
+    parser.add_argument("--knocks-per-user", type=int, default=5)
+    parser.add_argument("--cluster", type=int, default=500, help="users per dorm/gender pool")
+    parser.add_argument("--skew", type=float, default=1.2, help="Pareto shape; lower = more skewed")
+    parser.add_argument("--max-length", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    for n_users in args.users:
+        run(n_users, args.knocks_per_user, args.cluster, args.skew, args.max_length)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+from __future__ import annotations
+import os
+
+MAX_ITEMS = int(os.environ.get("BULK_MAX_ITEMS", 100))
+
+
+def parse_ids(data: dict, actions: tuple[str, ...]) -> dict[str, list[int]]:
+    """
+    {action: [id, ...]} from a bulk request body such as
+    {"accept": [1, 2], "delete": [3]}. Every action is optional but at
+    least one id is required. Duplicates are dropped, order is kept.
+    Raises ValueError with a client-facing message on anything else.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Request body must be a JSON object")
+    parsed, seen = {}, set()
+    for action in actions:
+        raw = data.get(action, [])
+        if not isinstance(raw, list) or not all(
+            isinstance(i, int) and not isinstance(i, bool) for i in raw
+        ):
+            raise ValueError(f"{action} must be a list of integer ids")
+        ids = list(dict.fromkeys(raw))
+        if seen.intersection(ids):
+            raise ValueError("An id may appear under only one action")
+        seen.update(ids)
+        parsed[action] = ids
+    if not seen:
+        raise ValueError(f"Provide ids under {' or '.join(actions)}")
+    if len(seen) > MAX_ITEMS:
+        raise ValueError(f"At most {MAX_ITEMS} ids per request")
+    return parsed
+
+
+def item_error(item_id: int, status: int, error: str) -> dict:
+    return {"id": item_id, "status": status, "error": error}
+
+
+def bulk_response(results: list[dict]) -> dict:
+    """
+    Response body for a bulk request: per-item results (grouped by
+    action, ids in the order given) plus counts. An item succeeded iff
+    its status is 2xx.
+    """
+    ok = sum(1 for r in results if r["status"] < 300)
+    return {"results": results, "succeeded": ok, "failed": len(results) - ok}
@@ -0,0 +1,66 @@
+import os
+
+from sqlalchemy import event
+
+DEFAULT_DATABASE_URL = "sqlite:///dormhop.db"
+
+
+def env_flag(name: str, default: bool = False) -> bool:
+    """
+    Read a boolean switch such as SQLALCHEMY_ECHO=1 from the environment.
+    """
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
+def database_uri() -> str:
+    """
+    DATABASE_URL from the environment, falling back to the local SQLite file.
+    Accepts the legacy `postgres://` scheme some hosts still hand out.
+    """
+    url = os.environ.get("DATABASE_URL", DEFAULT_DATABASE_URL)
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    return url
+
+
+def engine_options(uri: str) -> dict:
+    """
+    SQLALCHEMY_ENGINE_OPTIONS for the given URL.
+
+    Server databases get a bounded, pre-pinged connection pool per worker
+    process; SQLite keeps SQLAlchemy's defaults and is tuned through
+    connect-time pragmas instead (see install_sqlite_pragmas).
+    """
+    if uri.startswith("sqlite"):
+        return {}
+    return {
+        "pool_size":     int(os.environ.get("DB_POOL_SIZE", 10)),
+        "max_overflow":  int(os.environ.get("DB_MAX_OVERFLOW", 20)),
+        "pool_timeout":  int(os.environ.get("DB_POOL_TIMEOUT", 30)),
+        "pool_recycle":  int(os.environ.get("DB_POOL_RECYCLE", 1800)),
+        "pool_pre_ping": True,
+    }
+
+
+def install_sqlite_pragmas(engine):
+    """
+    On every new SQLite connection:
+        journal_mode=WAL    readers no longer block the writer
+        busy_timeout        wait for the write lock instead of failing
+        synchronous=NORMAL  one fsync per checkpoint rather than per commit
+    No-op for other databases.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    busy_ms = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", 5000))
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_conn, connection_record):
+        cursor = dbapi_conn.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA busy_timeout={busy_ms}")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
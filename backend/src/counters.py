@@ -0,0 +1,209 @@
+"""
+Per-user badge counters behind /api/users/me/summary.
+
+Writes keep them current inside their own transaction: ORM changes
+(accepting/deleting knocks, listing or unlisting a room) through the
+flush listener installed by track_counters, Core statements (send_knock,
+saved rooms) by calling bump() themselves. Every change is an upsert, so
+a user's or pool's row is created by the first write that touches it;
+rows for data that predates the counters come from migration 0004.
+
+To recompute everything (e.g. after manual SQL), from backend/src:
+    python counters.py
+"""
+from __future__ import annotations
+from collections import Counter, defaultdict
+
+from sqlalchemy import event, func, inspect, select, true
+from sqlalchemy.engine import Connection
+
+from db import (db, VALID_GENDERS, User, Room, Knock, UserCounter, ListingCounter,
+                saved_rooms, insert_ignoring_duplicates, insert_or_add)
+
+USER_COLUMNS = ("knocks_sent", "knocks_received_pending", "saved_rooms")
+
+
+def apply(deltas: dict[int, dict[str, int]], executor=None):
+    """
+    Add {user_id: {column: delta}} to user_counters, creating missing
+    rows. Rows are written in user id order so concurrent transactions
+    can't deadlock on them.
+    """
+    executor = executor if executor is not None else db.session
+    for user_id in sorted(deltas):
+        values = {col: d for col, d in deltas[user_id].items() if d}
+        if values:
+            executor.execute(insert_or_add(UserCounter.__table__, {"user_id": user_id}, values))
+
+
+def bump(user_id: int, **deltas: int):
+    apply({user_id: deltas})
+
+
+def _bump_pools(deltas: Counter, executor):
+    for gender in sorted(deltas):
+        if deltas[gender]:
+            executor.execute(insert_or_add(ListingCounter.__table__, {"gender": gender},
+                                           {"listed_rooms": deltas[gender]}))
+
+
+def _user_counts():
+    """
+    SELECT user_id, <USER_COLUMNS> computed from the source tables.
+    """
+    sent = select(func.count()).where(Knock.from_user_id == User.id).scalar_subquery()
+    pending = (select(func.count()).select_from(Knock)
+               .join(Room, Room.id == Knock.to_room_id)
+               .where(Room.owner_id == User.id, Knock.status == "pending")
+               .scalar_subquery())
+    saved = (select(func.count()).select_from(saved_rooms)
+             .where(saved_rooms.c.user_id == User.id)
+             .scalar_subquery())
+    # WHERE keeps SQLite from reading INSERT ... SELECT ... FROM users ON
+    # CONFLICT as a join constraint
+    return select(User.id, sent, pending, saved).where(true())
+
+
+def _pool_counts():
+    return (select(Room.gender, func.count())
+            .join(User, User.id == Room.owner_id)
+            .where(User.is_room_listed.is_(True))
+            .group_by(Room.gender))
+
+
+def _fill_users(executor, bind):
+    """
+    Insert computed rows for users that have none yet.
+    """
+    executor.execute(insert_ignoring_duplicates(UserCounter.__table__, bind)
+                     .from_select(["user_id", *USER_COLUMNS], _user_counts()))
+
+
+def _fill_pools(executor, bind):
+    executor.execute(insert_ignoring_duplicates(ListingCounter.__table__, bind)
+                     .from_select(["gender", "listed_rooms"], _pool_counts()))
+    executor.execute(insert_ignoring_duplicates(ListingCounter.__table__, bind),
+                     [{"gender": g, "listed_rooms": 0} for g in sorted(VALID_GENDERS)])
+
+
+def rebuild(executor):
+    """
+    Recompute every counter from scratch. `executor` is a session, or a
+    connection (which also works outside an app context, as in bulk loads).
+    """
+    bind = executor if isinstance(executor, Connection) else None
+    executor.execute(UserCounter.__table__.delete())
+    executor.execute(ListingCounter.__table__.delete())
+    _fill_users(executor, bind)
+    _fill_pools(executor, bind)
+
+
+def summary(current_user) -> dict:
+    """
+    The caller's counters plus listed rooms in their pool (every pool for
+    gender "other"), excluding their own room, as list_rooms does.
+    A user nothing has been counted for yet has all-zero counters.
+    """
+    pool = select(func.coalesce(func.sum(ListingCounter.listed_rooms), 0))
+    if current_user.gender != "other":
+        pool = pool.where(ListingCounter.gender == current_user.gender)
+    query = (select(*(getattr(UserCounter, c) for c in USER_COLUMNS),
+                    pool.scalar_subquery().label("listed_rooms"))
+             .where(UserCounter.user_id == current_user.id))
+
+    row = db.session.execute(query).first()
+    if row is None:
+        out = dict.fromkeys(USER_COLUMNS, 0)
+        out["listed_rooms"] = db.session.execute(pool).scalar()
+    else:
+        out = dict(row._mapping)
+    if current_user.is_room_listed and db.session.query(
+            db.exists().where(Room.owner_id == current_user.id)).scalar():
+        out["listed_rooms"] -= 1
+    return out
+
+
+def _committed(obj, attr: str):
+    """
+    The value `attr` had before this flush's pending changes.
+    """
+    state = inspect(obj)
+    history = state.attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    if not history.added:
+        return getattr(obj, attr)
+    if not state.persistent:
+        return None
+    # overwritten before it was ever loaded: ask the database
+    mapper = state.mapper
+    return state.session.connection().execute(
+        select(mapper.columns[attr])
+        .where(*(c == v for c, v in zip(mapper.primary_key, state.identity)))
+    ).scalar()
+
+
+def _owner_id(sess, knock) -> int:
+    room = knock.to_room or sess.get(Room, knock.to_room_id)
+    return room.owner_id
+
+
+def track_counters(session):
+    """
+    Adjust the counters inside every flush that adds, accepts or deletes
+    knocks through the ORM, or changes which rooms are listed.
+    """
+    @event.listens_for(session, "before_flush")
+    def _track(sess, flush_context, instances):
+        users: defaultdict = defaultdict(Counter)
+        pools: Counter = Counter()
+        rooms = set()
+
+        with sess.no_autoflush:
+            for obj in sess.new:
+                if isinstance(obj, Knock):
+                    users[obj.from_user_id]["knocks_sent"] += 1
+                    if obj.status in (None, "pending"):
+                        users[_owner_id(sess, obj)]["knocks_received_pending"] += 1
+                elif isinstance(obj, Room):
+                    rooms.add(obj)
+            for obj in sess.deleted:
+                if isinstance(obj, Knock):
+                    users[obj.from_user_id]["knocks_sent"] -= 1
+                    if _committed(obj, "status") == "pending":
+                        users[_owner_id(sess, obj)]["knocks_received_pending"] -= 1
+                elif isinstance(obj, Room):
+                    rooms.add(obj)
+            for obj in sess.dirty:
+                if isinstance(obj, Knock) and inspect(obj).attrs.status.history.has_changes():
+                    was = _committed(obj, "status") == "pending"
+                    now = obj.status == "pending"
+                    users[_owner_id(sess, obj)]["knocks_received_pending"] += now - was
+                elif (isinstance(obj, User)
+                        and inspect(obj).attrs.is_room_listed.history.has_changes()
+                        and obj.room is not None):
+                    rooms.add(obj.room)
+                elif isinstance(obj, Room) and inspect(obj).attrs.gender.history.has_changes():
+                    rooms.add(obj)
+
+            for room in rooms:
+                owner = room.owner or sess.get(User, room.owner_id)
+                if room not in sess.new and _committed(owner, "is_room_listed"):
+                    pools[_committed(room, "gender")] -= 1
+                if room not in sess.deleted and owner.is_room_listed:
+                    pools[room.gender] += 1
+
+        if users or pools:
+            conn = sess.connection()
+            apply(users, conn)
+            _bump_pools(pools, conn)
+
+
+if __name__ == "__main__":
+    from app import app
+
+    with app.app_context():
+        rebuild(db.session)
+        db.session.commit()
+        n = db.session.query(func.count(UserCounter.user_id)).scalar()
+    print(f"Rebuilt counters for {n} users")
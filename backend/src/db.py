@@ -2,6 +2,7 @@ from datetime import datetime, timezone
 import json
 
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects import postgresql, sqlite
 
 db = SQLAlchemy()
 
@@ -15,22 +16,102 @@ def _validate_gender(value: str) -> str:
         raise ValueError("gender must be 'male', 'female', or 'other'")
     return value
 
+def _validate_amenities(value) -> list[str]:
+    """
+    A room's amenity list: null means none; otherwise a list of distinct
+    strings, in the order the owner gave them.
+    """
+    if value is None:
+        return []
+    if not isinstance(value, list) or not all(isinstance(a, str) for a in value):
+        raise ValueError("amenities must be a list of strings")
+    if len(set(value)) != len(value):
+        raise ValueError("amenities must not contain duplicates")
+    return value
+
 # Saved‐rooms many-to-many table
 saved_rooms = db.Table(
     "saved_rooms",
     db.Column("user_id", db.Integer, db.ForeignKey("users.id"), primary_key=True),
     db.Column("room_id", db.Integer, db.ForeignKey("rooms.id"), primary_key=True),
+    # PK covers (user_id, ...) lookups; this covers "who saved this room"
+    db.Index("ix_saved_rooms_room_id", "room_id"),
 )
 
+
+def _insert(table, bind=None):
+    if (bind or db.engine).dialect.name == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
+
+
+def insert_ignoring_duplicates(table, bind=None):
+    """
+    INSERT ... ON CONFLICT DO NOTHING for the app's database (or for
+    `bind`, an engine or connection, outside an app context): a row that
+    would violate a unique index is skipped and rowcount stays 0.
+    """
+    return _insert(table, bind).on_conflict_do_nothing()
+
+
+def insert_or_add(table, key: dict, deltas: dict):
+    """
+    INSERT key + deltas as a new row, or ON CONFLICT add the deltas to the
+    existing row's columns: a counter upsert in one statement.
+    """
+    return (_insert(table).values(**key, **deltas)
+            .on_conflict_do_update(index_elements=list(key),
+                                   set_={col: table.c[col] + d for col, d in deltas.items()}))
+
+
+# Normalized amenities
+class Amenity(db.Model):
+    __tablename__ = "amenities"
+    id   = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    name = db.Column(db.String, nullable=False, unique=True)
+
+    @classmethod
+    def named(cls, name: str) -> "Amenity":
+        """
+        Get-or-create an amenity by name inside the current transaction.
+        A new name is inserted with ON CONFLICT DO NOTHING and re-selected,
+        so concurrent requests adding the same name both end up with the
+        one row instead of one of them failing on the unique index.
+        """
+        with db.session.no_autoflush:
+            amenity = cls.query.filter_by(name=name).first()
+            if amenity is None:
+                db.session.execute(insert_ignoring_duplicates(cls.__table__).values(name=name))
+                amenity = cls.query.filter_by(name=name).one()
+        return amenity
+
+class RoomAmenity(db.Model):
+    """
+    Association row between a room and an amenity. `position` keeps the
+    order the owner entered them in, so the API output is unchanged.
+    """
+    __tablename__ = "room_amenities"
+    room_id    = db.Column(db.Integer, db.ForeignKey("rooms.id"), primary_key=True)
+    amenity_id = db.Column(db.Integer, db.ForeignKey("amenities.id"), primary_key=True, index=True)
+    position   = db.Column(db.Integer, nullable=False, default=0)
+
+    amenity = db.relationship("Amenity", lazy="joined")
+
 class Room(db.Model):
     __tablename__ = "rooms"
+    __table_args__ = (
+        # keyset order of the feed (see pagination.keyset_page), for
+        # "other" users who see every gender ...
+        db.Index("ix_rooms_updated_at_id", "updated_at", "id"),
+        # ... and per gender pool, which is every other feed request
+        db.Index("ix_rooms_gender_updated_at_id", "gender", "updated_at", "id"),
+    )
     id              = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    dorm            = db.Column(db.String, nullable=False)
+    dorm            = db.Column(db.String, nullable=False, index=True)
     room_number     = db.Column(db.String, nullable=False)
     occupancy       = db.Column(db.Integer, nullable=False)
-    amenities       = db.Column(db.Text, nullable=False)  # JSON list
     description     = db.Column(db.String, nullable=True)
-    owner_id        = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    owner_id        = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, index=True)
     gender          = db.Column(db.String, nullable=False)
 
     created_at      = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
@@ -38,6 +119,10 @@ class Room(db.Model):
                           default=lambda: datetime.now(timezone.utc),
                           onupdate=lambda: datetime.now(timezone.utc))
 
+    amenity_links   = db.relationship("RoomAmenity", lazy="selectin",
+                                      order_by="RoomAmenity.position",
+                                      cascade="all, delete-orphan")
+
     def __init__(self, **kwargs):
         """
         Accepts:
@@ -47,7 +132,7 @@ class Room(db.Model):
         self.dorm         = kwargs["dorm"]
         self.room_number  = kwargs["room_number"]
         self.occupancy    = kwargs["occupancy"]
-        self.amenities    = json.dumps(kwargs.get("amenities", []))
+        self.amenities    = kwargs.get("amenities")
         self.description  = kwargs.get("description")
         self.owner_id     = kwargs["owner_id"]
 
@@ -55,19 +140,51 @@ class Room(db.Model):
             kwargs.get("gender") or kwargs.get("owner_gender")
         )
 
+    @property
+    def amenities(self) -> list[str]:
+        return [link.amenity.name for link in self.amenity_links]
+
+    @amenities.setter
+    def amenities(self, names: list[str]):
+        names = _validate_amenities(names)
+        # Reuse existing links so unchanged amenities are UPDATEd in place
+        # rather than DELETE+INSERTed on the same primary key.
+        existing = {link.amenity.name: link for link in self.amenity_links}
+        links = []
+        for position, name in enumerate(names):
+            link = existing.get(name) or RoomAmenity(amenity=Amenity.named(name))
+            link.position = position
+            links.append(link)
+        self.amenity_links = links
+        self.updated_at = datetime.now(timezone.utc)
+
     def serialize(self):
         return {
             "id": self.id,
             "dorm": self.dorm,
             "room_number": self.room_number,
             "occupancy": self.occupancy,
-            "amenities": json.loads(self.amenities),
+            "amenities": [link.amenity.name for link in self.amenity_links],
             "description": self.description,
             "gender": self.gender,
         }
 
+    def serialize_with_owner(self):
+        """
+        serialize() plus the owner card shown in the feeds; pair with an
+        eager profile that loads Room.owner (see loaders.py).
+        """
+        out = self.serialize()
+        out["owner"] = {"full_name": self.owner.full_name,
+                        "class_year": self.owner.class_year}
+        return out
+
 class User(db.Model):
     __tablename__ = "users"
+    __table_args__ = (
+        # feed / recommendation pool: listed rooms of one gender
+        db.Index("ix_users_listed_gender", "is_room_listed", "gender"),
+    )
     id         = db.Column(db.Integer, primary_key=True, autoincrement=True)
     email      = db.Column(db.String, nullable=False, unique=True)
     full_name  = db.Column(db.String, nullable=False)
@@ -79,10 +196,11 @@ class User(db.Model):
 
     room = db.relationship("Room", uselist=False, cascade="all, delete-orphan", backref="owner")
 
-    # bookmarks
+    # bookmarks; dynamic so that nothing loads a whole list by accident.
+    # Membership checks are primary-key probes of saved_rooms.
     saved_rooms = db.relationship(
-        "Room", secondary=saved_rooms,
-        backref="saved_by"
+        "Room", secondary=saved_rooms, lazy="dynamic",
+        backref=db.backref("saved_by", lazy="dynamic")
     )
 
     def __init__(self, **kwargs):
@@ -92,7 +210,7 @@ class User(db.Model):
         self.gender     = _validate_gender(kwargs.get("gender"))
         self.is_room_listed = kwargs.get("is_room_listed", False)
 
-    def simple_serialize(self) -> dict:
+    def simple_serialize(self):
         return {
             "id": self.id,
             "email": self.email,
@@ -101,25 +219,37 @@ class User(db.Model):
             "gender": self.gender,
         }
 
-    def serialize(self) -> dict:
-        data = self.simple_serialize()
-        data.update(
-            {
-                "created_at": self.created_at.isoformat() + "Z",
-                "current_room": self.room.serialize() if self.room else None,
-                "is_room_listed": self.is_room_listed,
-            }
-        )
-        return data
+    def serialize(self):
+        return {
+            "id": self.id,
+            "email": self.email,
+            "full_name": self.full_name,
+            "class_year": self.class_year,
+            "gender": self.gender,
+            "created_at": self.created_at,
+            "current_room": self.room.serialize() if self.room else None,
+            "is_room_listed": self.is_room_listed,
+        }
 
 class Knock(db.Model):
     __tablename__ = "knocks"
+    __table_args__ = (
+        # one knock per (user, room): duplicate and reciprocal checks are
+        # a single probe, and concurrent duplicates fail on insert.
+        # Also serves "knocks sent by user" through its leading column.
+        db.Index("ux_knocks_from_user_to_room", "from_user_id", "to_room_id", unique=True),
+        # knocks received on a room, optionally by status
+        db.Index("ix_knocks_to_room_status", "to_room_id", "status"),
+    )
     id              = db.Column(db.Integer, primary_key=True, autoincrement=True)
     from_user_id    = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
     to_room_id      = db.Column(db.Integer, db.ForeignKey("rooms.id"), nullable=False)
     status          = db.Column(db.String,  nullable=False, default="pending")
     created_at      = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     accepted_at     = db.Column(db.DateTime, nullable=True)
+    updated_at      = db.Column(db.DateTime,
+                          default=lambda: datetime.now(timezone.utc),
+                          onupdate=lambda: datetime.now(timezone.utc))
 
     from_user = db.relationship("User", backref="knocks_sent", foreign_keys=[from_user_id])
     to_room   = db.relationship("Room", backref="knocks_received", foreign_keys=[to_room_id])
@@ -130,6 +260,56 @@ class Knock(db.Model):
             "from_user": self.from_user.simple_serialize(),
             "to_room": self.to_room.serialize(),
             "status": self.status,
-            "created_at": self.created_at.isoformat() + "Z",
-            "accepted_at": self.accepted_at.isoformat() + "Z" if self.accepted_at else None
-        }
\ No newline at end of file
+            "created_at": self.created_at,
+            "accepted_at": self.accepted_at,
+        }
+
+class Tombstone(db.Model):
+    """
+    A room that left the feed (deleted or unlisted) or a deleted knock,
+    kept so ?since= delta syncs can tell clients to drop it (see sync.py).
+    """
+    __tablename__ = "tombstones"
+    __table_args__ = (
+        db.Index("ix_tombstones_kind_user_removed_at", "kind", "user_id", "removed_at"),
+    )
+    id          = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    kind        = db.Column(db.String, nullable=False)   # "room" | "knock"
+    object_id   = db.Column(db.Integer, nullable=False)
+    user_id     = db.Column(db.Integer, nullable=True)   # knocks: the party it is for; rooms: NULL
+    removed_at  = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+
+class UserCounter(db.Model):
+    """
+    Badge counts for one user, kept up to date by the writes that change
+    them (see counters.py) so /api/users/me/summary is one row read.
+    """
+    __tablename__ = "user_counters"
+    user_id                 = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    knocks_sent             = db.Column(db.Integer, nullable=False, default=0)
+    knocks_received_pending = db.Column(db.Integer, nullable=False, default=0)
+    saved_rooms             = db.Column(db.Integer, nullable=False, default=0)
+
+class ListingCounter(db.Model):
+    """
+    Listed rooms per gender pool (see counters.py).
+    """
+    __tablename__ = "listing_counters"
+    gender       = db.Column(db.String, primary_key=True)
+    listed_rooms = db.Column(db.Integer, nullable=False, default=0)
+
+class DormFeature(db.Model):
+    """
+    Scraped "Community Features" for one dorm, refreshed in the
+    background by feature_store.FeatureRefresher.
+    """
+    __tablename__ = "dorm_features"
+    dorm        = db.Column(db.String, primary_key=True)
+    url         = db.Column(db.String, nullable=False)
+    features    = db.Column(db.Text, nullable=False, default="[]")  # JSON list
+    fetched_at  = db.Column(db.DateTime, nullable=True)   # last successful scrape
+    checked_at  = db.Column(db.DateTime, nullable=False)  # last attempt
+    error       = db.Column(db.String, nullable=True)     # last failure, if any
+
+    def feature_list(self) -> list[str]:
+        return json.loads(self.features)
@@ -0,0 +1,275 @@
+from __future__ import annotations
+import asyncio
+import json
+import logging
+import os
+import queue
+import select
+import threading
+import time
+from collections import defaultdict, namedtuple
+
+from sqlalchemy import text
+
+from serializers import dumps
+
+log = logging.getLogger(__name__)
+
+KEEPALIVE_SECONDS  = int(os.environ.get("EVENTS_KEEPALIVE_SECONDS", 15))
+MAX_STREAM_SECONDS = int(os.environ.get("EVENTS_MAX_STREAM_SECONDS", 300))
+QUEUE_SIZE         = int(os.environ.get("EVENTS_QUEUE_SIZE", 100))
+RETRY_MS           = 3000
+
+# WSGI environ keys shared with asgi.py: the server sets the first when it
+# can stream event bodies on its event loop; the view then leaves its
+# Subscription under the second instead of returning a blocking generator
+ASYNC_STREAMS_KEY = "dormhop.async_streams"
+SUBSCRIPTION_KEY  = "dormhop.subscription"
+
+Event = namedtuple("Event", ["type", "data"])
+
+
+class Subscription:
+    """
+    One open event stream: a bounded queue of events for one user.
+
+    A client that stops reading cannot make the queue grow without
+    bound; once it is full, further events are dropped and the stream
+    tells the client to resync (refetch its knock lists) instead.
+    """
+    def __init__(self, user_id: int, maxsize: int = QUEUE_SIZE):
+        self.user_id = user_id
+        self._queue: queue.Queue = queue.Queue(maxsize)
+        self.overflowed = False
+        self._ready: asyncio.Event | None = None
+        self._wake = None
+
+    def push(self, event: Event):
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+            return
+        if self._wake is not None:
+            self._wake()
+
+    def get(self, timeout: float) -> Event | None:
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    async def get_async(self, timeout: float) -> Event | None:
+        """
+        get() for a coroutine: waits on the running event loop instead of
+        blocking a thread. Events are pushed from other threads, which
+        wake the loop with call_soon_threadsafe.
+        """
+        if self._wake is None:
+            loop, ready = asyncio.get_running_loop(), asyncio.Event()
+
+            def wake():
+                try:
+                    loop.call_soon_threadsafe(ready.set)
+                except RuntimeError:  # loop already closed
+                    pass
+            self._ready, self._wake = ready, wake
+
+        self._ready.clear()
+        try:
+            return self._queue.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        try:
+            return self._queue.get_nowait()
+        except queue.Empty:
+            return None
+
+
+class PostgresTransport:
+    """
+    Carries events between worker processes over PostgreSQL
+    LISTEN/NOTIFY, so no extra service is needed in production.
+
+    send() NOTIFYs in its own short transaction. One listener thread per
+    process (started with the first subscriber) holds a dedicated
+    connection outside the pool and hands every notification to
+    `deliver`, including the ones this process sent.
+    """
+    CHANNEL = "dormhop_events"
+    MAX_PAYLOAD = 7900  # NOTIFY payloads must stay under 8000 bytes
+
+    def __init__(self, engine, deliver):
+        self.engine = engine
+        self.deliver = deliver
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def send(self, user_ids: list[int], event_type: str, data: dict):
+        payload = dumps({"u": user_ids, "t": event_type, "d": data})
+        if len(payload) > self.MAX_PAYLOAD:
+            # clients refetch the knock by id
+            payload = dumps({"u": user_ids, "t": event_type,
+                             "d": {"id": data.get("id"), "partial": True}})
+        with self.engine.begin() as conn:
+            conn.execute(text("SELECT pg_notify(:channel, :payload)"),
+                         {"channel": self.CHANNEL, "payload": payload.decode()})
+
+    def ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="events-listener", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self._listen()
+            except Exception:
+                log.exception("event listener lost its connection; reconnecting")
+                time.sleep(1)
+
+    def _listen(self):
+        raw = self.engine.raw_connection()
+        raw.detach()  # never hand this connection back to the pool
+        conn = raw.connection
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {self.CHANNEL}")
+            while True:
+                if select.select([conn], [], [], KEEPALIVE_SECONDS) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    msg = json.loads(conn.notifies.pop(0).payload)
+                    self.deliver(msg["u"], msg["t"], msg["d"])
+        finally:
+            raw.close()
+
+
+class EventBus:
+    """
+    Per-user pub/sub behind /api/events/.
+
+    Views publish after their transaction commits; every open stream of
+    each addressed user receives the event. With the default "local"
+    backend events only reach streams served by the same process, which
+    is enough for a single worker. EVENTS_BACKEND=postgres shares them
+    between workers (see PostgresTransport).
+    """
+    def __init__(self):
+        self._subscribers: defaultdict = defaultdict(set)
+        self._lock = threading.Lock()
+        self.transport: PostgresTransport | None = None
+        self.published = 0
+
+    def init_app(self, app, engine):
+        backend = os.environ.get("EVENTS_BACKEND", "local")
+        if backend == "postgres":
+            if engine.dialect.name != "postgresql":
+                raise RuntimeError("EVENTS_BACKEND=postgres needs a PostgreSQL DATABASE_URL")
+            self.transport = PostgresTransport(engine, self._deliver)
+        elif backend != "local":
+            raise RuntimeError(f"Unknown EVENTS_BACKEND {backend!r}")
+
+    def subscribe(self, user_id: int) -> Subscription:
+        if self.transport is not None:
+            self.transport.ensure_started()
+        sub = Subscription(user_id)
+        with self._lock:
+            self._subscribers[user_id].add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            subs = self._subscribers.get(sub.user_id)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[sub.user_id]
+
+    def publish(self, user_ids, event_type: str, data: dict):
+        """
+        Send `data` as a `event_type` event to every stream of `user_ids`.
+        Call after the commit that made the change visible.
+        """
+        user_ids = sorted(set(user_ids))
+        self.published += 1
+        if self.transport is not None:
+            try:
+                self.transport.send(user_ids, event_type, data)
+            except Exception:
+                # the write already committed; clients still see it on refetch
+                log.exception("could not publish %s event", event_type)
+        else:
+            self._deliver(user_ids, event_type, data)
+
+    def _deliver(self, user_ids, event_type: str, data: dict):
+        event = Event(event_type, data)
+        with self._lock:
+            targets = [sub for uid in user_ids for sub in self._subscribers.get(uid, ())]
+        for sub in targets:
+            sub.push(event)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": "postgres" if self.transport else "local",
+                "streams": sum(len(s) for s in self._subscribers.values()),
+                "users": len(self._subscribers),
+                "published": self.published,
+            }
+
+
+bus = EventBus()
+
+
+def _frame(sub: Subscription, event: Event | None) -> str:
+    """
+    What to write after waiting for an event: a resync notice if events
+    were dropped, then the event or a keep-alive comment.
+    """
+    out = ""
+    if sub.overflowed:
+        sub.overflowed = False
+        out = "event: resync\ndata: {}\n\n"
+    if event is None:
+        return out + ": keepalive\n\n"
+    return out + f"event: {event.type}\ndata: {dumps(event.data).decode()}\n\n"
+
+
+def sse_stream(sub: Subscription, keepalive: int = KEEPALIVE_SECONDS,
+               max_seconds: int = MAX_STREAM_SECONDS):
+    """
+    text/event-stream body for one subscription.
+
+    Comments keep idle connections (and proxies) alive. After
+    `max_seconds` the stream ends and the client's automatic reconnect
+    opens a new one, so long-lived connections don't pin a worker
+    forever. The caller unsubscribes `sub` when the response closes,
+    whether or not the body was ever iterated.
+    """
+    deadline = time.monotonic() + max_seconds
+    yield f"retry: {RETRY_MS}\n: connected\n\n"
+    while (remaining := deadline - time.monotonic()) > 0:
+        yield _frame(sub, sub.get(timeout=min(keepalive, remaining)))
+
+
+async def sse_stream_async(sub: Subscription, keepalive: int = KEEPALIVE_SECONDS,
+                           max_seconds: int = MAX_STREAM_SECONDS):
+    """
+    sse_stream() as an async generator, for asgi.py: an open stream is a
+    suspended coroutine rather than a thread parked in Queue.get().
+    As there, the caller unsubscribes `sub`.
+    """
+    deadline = time.monotonic() + max_seconds
+    yield f"retry: {RETRY_MS}\n: connected\n\n"
+    while (remaining := deadline - time.monotonic()) > 0:
+        yield _frame(sub, await sub.get_async(timeout=min(keepalive, remaining)))
@@ -0,0 +1,188 @@
+"""
+Background pipeline that keeps the dorm_features table filled.
+
+Pages are fetched concurrently over one pooled HTTP session and written
+to the database with timestamps; /api/dorm_features/ only ever reads the
+table, so no request waits on cornell.edu.
+
+One-off refresh (from backend/src):
+    python feature_store.py [--force] [--base-url http://127.0.0.1:8000]
+
+--base-url swaps the scheme/host of every DORM_URLS entry while keeping
+the path, so the pipeline can run against a local fixture server, e.g.
+`python -m http.server` over a directory of saved pages.
+"""
+from __future__ import annotations
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from db import db, DormFeature
+from scraper import scrape_community_features
+from urls import DORM_URLS
+
+SCRAPE_WORKERS   = int(os.environ.get("FEATURE_SCRAPE_WORKERS", 8))
+SCRAPE_TIMEOUT   = int(os.environ.get("FEATURE_SCRAPE_TIMEOUT", 10))
+TTL              = timedelta(hours=int(os.environ.get("FEATURE_TTL_HOURS", 24)))
+RETRY_AFTER      = timedelta(minutes=int(os.environ.get("FEATURE_RETRY_MINUTES", 30)))
+REFRESH_INTERVAL = int(os.environ.get("FEATURE_REFRESH_SECONDS", 600))
+
+
+def localize(urls: dict[str, str], base_url: str) -> dict[str, str]:
+    """
+    Point every URL at `base_url`, keeping its path.
+    """
+    base = base_url.rstrip("/")
+    return {slug: base + urlsplit(url).path for slug, url in urls.items()}
+
+
+def make_session(pool_size: int = SCRAPE_WORKERS) -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def fetch_all(urls: dict[str, str], session: requests.Session | None = None,
+              workers: int = SCRAPE_WORKERS) -> dict[str, tuple[list[str] | None, str | None]]:
+    """
+    Scrape every URL concurrently.
+    Returns slug -> (features, None) on success or (None, error) on failure.
+    """
+    own_session = session is None
+    session = session or make_session(workers)
+
+    def _one(url):
+        try:
+            return scrape_community_features(url, timeout=SCRAPE_TIMEOUT, session=session), None
+        except Exception as exc:
+            return None, f"{type(exc).__name__}: {exc}"[:500]
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(urls)))) as pool:
+            results = pool.map(_one, urls.values())
+            return dict(zip(urls.keys(), results))
+    finally:
+        if own_session:
+            session.close()
+
+
+def due(urls: dict[str, str], now: datetime | None = None) -> dict[str, str]:
+    """
+    The subset of `urls` whose stored row is missing or stale. Failed
+    scrapes are retried sooner (RETRY_AFTER) than successful ones (TTL).
+    """
+    now = now or datetime.now(timezone.utc)
+    rows = {row.dorm: row for row in DormFeature.query.filter(DormFeature.dorm.in_(urls))}
+    out = {}
+    for slug, url in urls.items():
+        row = rows.get(slug)
+        if row is None or row.url != url:
+            out[slug] = url
+            continue
+        checked = row.checked_at.replace(tzinfo=timezone.utc)
+        if now - checked >= (RETRY_AFTER if row.error else TTL):
+            out[slug] = url
+    return out
+
+
+def refresh(urls: dict[str, str] = DORM_URLS, force: bool = False,
+            session: requests.Session | None = None) -> dict[str, str | None]:
+    """
+    Scrape stale (or, with force=True, all) dorms and upsert the results.
+    A failed scrape keeps the last good features and records the error.
+    Needs an app context. Returns slug -> error (None on success).
+    """
+    targets = dict(urls) if force else due(urls)
+    if not targets:
+        return {}
+
+    results = fetch_all(targets, session=session)
+    now = datetime.now(timezone.utc)
+    for slug, (features, error) in results.items():
+        row = DormFeature.query.get(slug) or DormFeature(dorm=slug, url=targets[slug])
+        row.url        = targets[slug]
+        row.checked_at = now
+        row.error      = error
+        if features is not None:
+            row.features   = json.dumps(features)
+            row.fetched_at = now
+        db.session.add(row)
+    db.session.commit()
+    return {slug: error for slug, (_, error) in results.items()}
+
+
+def load_all(urls: dict[str, str] = DORM_URLS) -> dict[str, list[str]]:
+    """
+    dorm -> features straight from the table; dorms never scraped map to [].
+    """
+    stored = {row.dorm: row.feature_list() for row in DormFeature.query.all()}
+    return {slug: stored.get(slug, []) for slug in urls}
+
+
+class FeatureRefresher:
+    """
+    Daemon thread that calls `refresh` every REFRESH_INTERVAL seconds.
+    Each worker process may run one; the staleness check keeps them from
+    re-scraping what another worker already stored.
+    """
+    def __init__(self, interval: int = REFRESH_INTERVAL):
+        self.interval = interval
+        self._lock    = threading.Lock()
+        self._stop    = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def ensure_started(self, app):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, args=(app,), name="feature-refresher", daemon=True
+                )
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self, app):
+        session = make_session()
+        while not self._stop.is_set():
+            with app.app_context():
+                try:
+                    refresh(session=session)
+                except Exception:
+                    app.logger.exception("dorm feature refresh failed")
+                    db.session.rollback()
+                finally:
+                    db.session.remove()
+            self._stop.wait(self.interval)
+        session.close()
+
+
+refresher = FeatureRefresher()
+
+
+if __name__ == "__main__":
+    import argparse
+    from app import app
+
+    parser = argparse.ArgumentParser(description="Refresh the dorm_features table once.")
+    parser.add_argument("--force", action="store_true", help="re-scrape even fresh rows")
+    parser.add_argument("--base-url", help="fetch from this host instead of scl.cornell.edu")
+    args = parser.parse_args()
+
+    targets = localize(DORM_URLS, args.base_url) if args.base_url else DORM_URLS
+    with app.app_context():
+        outcome = refresh(targets, force=args.force)
+    for slug, error in outcome.items():
+        print(f"{'✅' if error is None else '❌'} {slug}" + (f": {error}" if error else ""))
+    if not outcome:
+        print("All dorm features are fresh")
@@ -0,0 +1,207 @@
+"""
+Google ID-token verification against a cached copy of Google's signing
+certificates.
+
+google.oauth2.id_token.verify_oauth2_token downloads the certs on every
+call. Here they are fetched over one persistent session, kept for the
+Cache-Control max-age Google sends, and refreshed by a background thread
+shortly before they expire, so a sign-in only waits on the network the
+very first time (or when Google rotates to a key we have not seen).
+
+Offline stand-in for Google (from backend/src):
+    python google_certs.py serve --port 8765        # serves /oauth2/v1/certs
+    python google_certs.py mint --email netid@cornell.edu
+    GOOGLE_CERTS_URL=http://127.0.0.1:8765/oauth2/v1/certs python app.py
+"""
+from __future__ import annotations
+import os
+import re
+import threading
+import time
+
+import jwt as pyjwt
+import requests
+from google.auth import jwt as google_jwt
+
+CERTS_URL      = os.environ.get("GOOGLE_CERTS_URL", "https://www.googleapis.com/oauth2/v1/certs")
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+MIN_TTL        = 60    # floor for max-age, and the retry delay after a failed refresh
+REFRESH_MARGIN = 300   # refresh this many seconds before the certs expire
+MISSING_KID_COOLDOWN = 30
+
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+class CertCache:
+    """
+    Google's kid -> PEM certificate map with Cache-Control-driven expiry.
+    """
+    def __init__(self, url: str = CERTS_URL, session: requests.Session | None = None):
+        self.url = url
+        self.session = session or requests.Session()
+        self._certs: dict[str, str] = {}
+        self._expires_at = 0.0
+        self._last_forced = 0.0
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    def certs(self) -> dict[str, str]:
+        """
+        Current certs; blocks on the network only if none are cached or
+        they have fully expired.
+        """
+        if not self._certs or time.time() >= self._expires_at:
+            with self._lock:
+                if not self._certs or time.time() >= self._expires_at:
+                    self._fetch()
+        return self._certs
+
+    def certs_with(self, kid: str | None) -> dict[str, str]:
+        """
+        Like certs(), but refetch once (rate-limited) if `kid` is unknown,
+        which is what a key rotation looks like from here.
+        """
+        certs = self.certs()
+        if kid and kid not in certs and time.time() - self._last_forced > MISSING_KID_COOLDOWN:
+            with self._lock:
+                self._last_forced = time.time()
+                self._fetch()
+            certs = self._certs
+        return certs
+
+    def _fetch(self):
+        resp = self.session.get(self.url, timeout=5)
+        resp.raise_for_status()
+        match = _MAX_AGE.search(resp.headers.get("Cache-Control", ""))
+        max_age = int(match.group(1)) if match else MIN_TTL
+        max_age -= int(resp.headers.get("Age", 0) or 0)
+        self._certs = resp.json()
+        self._expires_at = time.time() + max(max_age, MIN_TTL)
+
+    def ensure_started(self):
+        """
+        Start the background refresher (idempotent).
+        """
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="google-certs", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                with self._lock:
+                    self._fetch()
+                delay = max(self._expires_at - time.time() - REFRESH_MARGIN, MIN_TTL)
+            except (requests.RequestException, ValueError):
+                delay = MIN_TTL
+            self._stop.wait(delay)
+
+
+cert_cache = CertCache()
+
+
+def verify_google_id_token(token: str, audience: str, cache: CertCache = cert_cache) -> dict:
+    """
+    Same checks as google.oauth2.id_token.verify_oauth2_token (signature,
+    exp/iat, audience, issuer) using cached certs.
+    Raises ValueError if the token is invalid for any reason.
+    """
+    try:
+        kid = pyjwt.get_unverified_header(token).get("kid")
+    except pyjwt.InvalidTokenError as exc:
+        raise ValueError(str(exc)) from exc
+    try:
+        certs = cache.certs_with(kid)
+    except requests.RequestException as exc:
+        raise ValueError(f"Could not fetch Google certificates: {exc}") from exc
+
+    info = google_jwt.decode(token, certs=certs, audience=audience)
+    if info.get("iss") not in GOOGLE_ISSUERS:
+        raise ValueError(f"Wrong issuer: {info.get('iss')}")
+    return info
+
+
+# Local stand-in for Google: a cert endpoint plus a token minter
+def _load_or_create_key(path: str):
+    import rsa
+    if not os.path.exists(path):
+        _, private = rsa.newkeys(2048)
+        with open(path, "wb") as fh:
+            fh.write(private.save_pkcs1())
+    with open(path, "rb") as fh:
+        return rsa.PrivateKey.load_pkcs1(fh.read())
+
+
+def _serve(port: int, key_path: str, kid: str, max_age: int):
+    import json
+    import rsa
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    private = _load_or_create_key(key_path)
+    public_pem = rsa.PublicKey(private.n, private.e).save_pkcs1().decode()
+    body = json.dumps({kid: public_pem}).encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/oauth2/v1/certs":
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Cache-Control", f"public, max-age={max_age}")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    print(f"Serving certs for kid={kid!r} at http://127.0.0.1:{port}/oauth2/v1/certs")
+    ThreadingHTTPServer(("127.0.0.1", port), Handler).serve_forever()
+
+
+def _mint(key_path: str, kid: str, email: str, name: str, audience: str) -> str:
+    from google.auth import crypt
+
+    private = _load_or_create_key(key_path)
+    signer = crypt.RSASigner.from_string(private.save_pkcs1().decode(), key_id=kid)
+    now = int(time.time())
+    payload = {
+        "iss": "https://accounts.google.com",
+        "aud": audience,
+        "sub": email,
+        "email": email,
+        "name": name,
+        "hd": email.split("@")[-1],
+        "iat": now,
+        "exp": now + 3600,
+    }
+    return google_jwt.encode(signer, payload).decode()
+
+
+if __name__ == "__main__":
+    import argparse
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Local stand-in for Google's ID-token certs.")
+    parser.add_argument("--key", default="dev_google_key.pem", help="RSA key file (created if missing)")
+    parser.add_argument("--kid", default="dormhop-dev")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    serve = sub.add_parser("serve", help="serve /oauth2/v1/certs")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--max-age", type=int, default=3600)
+    mint = sub.add_parser("mint", help="print a signed ID token")
+    mint.add_argument("--email", required=True)
+    mint.add_argument("--name", default="Dev User")
+    mint.add_argument("--audience", default=os.environ.get("GOOGLE_CLIENT_ID"))
+    args = parser.parse_args()
+
+    if args.cmd == "serve":
+        _serve(args.port, args.key, args.kid, args.max_age)
+    else:
+        print(_mint(args.key, args.kid, args.email, args.name, args.audience))
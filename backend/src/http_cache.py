@@ -0,0 +1,165 @@
+from __future__ import annotations
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict, namedtuple
+from datetime import datetime, timezone
+from functools import wraps
+from itertools import chain
+
+from flask import make_response, request
+from sqlalchemy import event
+
+MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", 2048))
+
+CachedResponse = namedtuple(
+    "CachedResponse", ["body", "etag", "last_modified", "expires_at", "generation"]
+)
+
+
+class ResponseCache:
+    """
+    In-process TTL + LRU cache of serialized 200 responses.
+
+    Entries are grouped by tag ("rooms", "dorm_features", ...). Invalidating
+    a tag bumps its generation, which makes every older entry a miss
+    without having to find them. Other worker processes only see the
+    change once their own entries expire, so TTLs should stay short for
+    data users edit.
+    """
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._generations: defaultdict = defaultdict(int)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def generation(self, tag: str) -> int:
+        with self._lock:
+            return self._generations[tag]
+
+    def get(self, key, tag: str) -> CachedResponse | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if (entry is None
+                    or entry.expires_at < time.monotonic()
+                    or entry.generation != self._generations[tag]):
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, tag: str, body: bytes, ttl: int, generation: int) -> CachedResponse:
+        """
+        Store `body`, which was built while `tag` was at `generation`.
+        If the tag has been invalidated since, the entry is returned but
+        not kept, so a slow request can't resurrect stale data.
+        """
+        entry = CachedResponse(
+            body=body,
+            etag=hashlib.sha1(body).hexdigest(),
+            last_modified=datetime.now(timezone.utc).replace(microsecond=0),
+            expires_at=time.monotonic() + ttl,
+            generation=generation,
+        )
+        with self._lock:
+            if generation == self._generations[tag]:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, *tags: str):
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+response_cache = ResponseCache()
+
+# returned by a `cached` key function for requests that should bypass the
+# cache entirely (one-off responses that would only evict useful entries)
+NO_CACHE = object()
+
+
+def cached(tag: str, ttl: int, key):
+    """
+    Cache a `(serializers.dumps(...), status)` view behind @auth_required and answer
+    conditional GETs.
+
+        @app.route(...)
+        @auth_required
+        @cached("rooms", ttl=30, key=lambda user, room_id: (user.id, room_id))
+        def get_room(current_user, room_id): ...
+
+    `key(current_user, *args, **kwargs)` must capture everything the body
+    depends on, or return NO_CACHE to run the view uncached. Only 200
+    `(body, status)` responses are cached; a view may return a Response
+    object (e.g. a stream) to bypass the cache.
+    Every cached response carries an ETag and Last-Modified; a matching
+    If-None-Match (or, without it, If-Modified-Since) gets an empty 304.
+    """
+    def decorator(view_fn):
+        @wraps(view_fn)
+        def wrapper(current_user, *args, **kwargs):
+            view_key = key(current_user, *args, **kwargs)
+            if view_key is NO_CACHE:
+                return view_fn(current_user, *args, **kwargs)
+            cache_key = (view_fn.__name__, view_key)
+            entry = response_cache.get(cache_key, tag)
+            if entry is None:
+                generation = response_cache.generation(tag)
+                rv = view_fn(current_user, *args, **kwargs)
+                if not isinstance(rv, tuple):  # streamed Response, never cached
+                    return rv
+                body, status = rv
+                if status != 200:
+                    return rv
+                entry = response_cache.put(cache_key, tag, body, ttl, generation)
+
+            resp = make_response(entry.body, 200)
+            resp.set_etag(entry.etag)
+            resp.last_modified = entry.last_modified
+            resp.cache_control.private = True
+            resp.cache_control.no_cache = True
+            return resp.make_conditional(request)
+        return wrapper
+    return decorator
+
+
+def invalidate_on_commit(session, model_tags: dict):
+    """
+    Invalidate the tags of every model class in `model_tags` that was
+    inserted, updated or deleted once the transaction commits. Changes
+    that only touch a relationship collection (e.g. saved_rooms) are
+    ignored.
+    """
+    @event.listens_for(session, "after_flush")
+    def _collect(sess, flush_context):
+        tags = sess.info.setdefault("http_cache_tags", set())
+        for obj in chain(sess.new, sess.deleted):
+            if type(obj) in model_tags:
+                tags.add(model_tags[type(obj)])
+        for obj in sess.dirty:
+            if type(obj) in model_tags and sess.is_modified(obj, include_collections=False):
+                tags.add(model_tags[type(obj)])
+
+    @event.listens_for(session, "after_commit")
+    def _apply(sess):
+        tags = sess.info.pop("http_cache_tags", None)
+        if tags:
+            response_cache.invalidate(*tags)
+
+    @event.listens_for(session, "after_rollback")
+    def _discard(sess):
+        sess.info.pop("http_cache_tags", None)
@@ -0,0 +1,119 @@
+from __future__ import annotations
+import bisect
+import threading
+import time
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+# Upper bounds (ms) of the histogram buckets; the last bucket is open-ended
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram; cheap enough to update on every request.
+    """
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total  = 0.0
+        self.n      = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.n += 1
+
+    def to_dict(self) -> dict:
+        labels = [f"<={b}" for b in self.bounds] + [f">{self.bounds[-1]}"]
+        return {
+            "count": self.n,
+            "mean": round(self.total / self.n, 3) if self.n else 0.0,
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class EndpointStats:
+    def __init__(self):
+        self.request_ms  = Histogram(BUCKETS_MS)
+        self.db_ms       = Histogram(BUCKETS_MS)
+        self.queries     = Histogram(QUERY_COUNT_BUCKETS)
+        self.slowest_ms  = 0.0
+        self.slowest_sql = None
+
+    def to_dict(self) -> dict:
+        return {
+            "request_ms": self.request_ms.to_dict(),
+            "db_ms": self.db_ms.to_dict(),
+            "queries": self.queries.to_dict(),
+            "slowest_query": {"ms": round(self.slowest_ms, 3), "sql": self.slowest_sql},
+        }
+
+
+class QueryMetrics:
+    """
+    Per-request query count, total DB time and slowest statement, exposed
+    as a Server-Timing header and aggregated per endpoint for /api/admin/metrics/.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.endpoints: dict[str, EndpointStats] = {}
+
+    def init_app(self, app, engine):
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {name: stats.to_dict() for name, stats in sorted(self.endpoints.items())}
+
+    # Engine events
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = (time.perf_counter() - conn.info["query_start"].pop()) * 1000
+        if not has_request_context() or "db_stats" not in g:
+            return
+        stats = g.db_stats
+        stats["count"] += 1
+        stats["ms"] += elapsed
+        if elapsed > stats["slowest_ms"]:
+            stats["slowest_ms"] = elapsed
+            stats["slowest_sql"] = statement
+
+    # Request hooks
+    def _before_request(self):
+        g.request_start = time.perf_counter()
+        g.db_stats = {"count": 0, "ms": 0.0, "slowest_ms": 0.0, "slowest_sql": None}
+
+    def _after_request(self, response):
+        if "db_stats" not in g:
+            return response
+        total_ms = (time.perf_counter() - g.request_start) * 1000
+        stats = g.db_stats
+
+        response.headers.add(
+            "Server-Timing",
+            f'db;dur={stats["ms"]:.2f};desc="{stats["count"]} queries", '
+            f'db-slowest;dur={stats["slowest_ms"]:.2f}, '
+            f'app;dur={total_ms:.2f}',
+        )
+
+        endpoint = request.endpoint or "<unmatched>"
+        with self._lock:
+            ep = self.endpoints.setdefault(endpoint, EndpointStats())
+            ep.request_ms.observe(total_ms)
+            ep.db_ms.observe(stats["ms"])
+            ep.queries.observe(stats["count"])
+            if stats["slowest_ms"] > ep.slowest_ms:
+                ep.slowest_ms = stats["slowest_ms"]
+                ep.slowest_sql = stats["slowest_sql"]
+        return response
+
+
+metrics = QueryMetrics()
@@ -0,0 +1,92 @@
+from __future__ import annotations
+from contextlib import contextmanager
+
+from sqlalchemy import event
+from sqlalchemy.orm import contains_eager, joinedload
+
+from db import db, Room, Knock
+
+# Eager-loading profiles, one per access pattern.
+#
+# Every serializer that touches a relationship (Room.owner in the feeds,
+# Knock.from_user / Knock.to_room in Knock.serialize) must be paired with
+# a profile here, otherwise each row costs an extra SELECT.
+#
+# "*_joined" profiles are for queries that already JOIN the related table
+# for filtering; contains_eager reuses that join instead of adding another.
+#
+# Profiles are callables because Room.owner and friends are backrefs that
+# only exist once the mappers have been configured.
+PROFILES = {
+    # Room + owner, for queries that do Room.query.join(User)
+    "room_feed_joined":     lambda: (contains_eager(Room.owner),),
+    # Room + owner, for plain Room queries (detail, saved list, knocks)
+    "room_with_owner":      lambda: (joinedload(Room.owner),),
+    # Knock + sender + target room, for plain Knock queries
+    "knock_full":           lambda: (joinedload(Knock.from_user), joinedload(Knock.to_room)),
+    # Knock + sender + target room, for Knock.query.join(Room, Knock.to_room)
+    "knock_full_joined":    lambda: (joinedload(Knock.from_user), contains_eager(Knock.to_room)),
+    # Knock + target room + its owner, for auth checks on a single knock
+    "knock_with_room_owner": lambda: (
+        joinedload(Knock.from_user),
+        joinedload(Knock.to_room).joinedload(Room.owner),
+    ),
+}
+
+
+def eager(query, profile: str):
+    """
+    Attach the loader options of a named profile to a query.
+    """
+    return query.options(*PROFILES[profile]())
+
+
+class QueryCounter:
+    """
+    Collects every SQL statement executed while active.
+    """
+    def __init__(self):
+        self.statements: list[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+
+@contextmanager
+def count_queries(engine=None):
+    """
+    Count statements sent to the database inside the block.
+
+        with count_queries() as q:
+            client.get("/api/rooms/", headers=auth)
+        print(q.count, q.statements)
+
+    Must run inside an app context when `engine` is omitted.
+    """
+    engine = engine if engine is not None else db.engine
+    counter = QueryCounter()
+
+    def _on_execute(conn, cursor, statement, parameters, context, executemany):
+        counter.statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _on_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", _on_execute)
+
+
+@contextmanager
+def assert_max_queries(limit: int, engine=None):
+    """
+    Guard against N+1 regressions: raise AssertionError if the block
+    issues more than `limit` statements.
+    """
+    with count_queries(engine) as counter:
+        yield counter
+    if counter.count > limit:
+        listing = "\n".join(f"  {i + 1}. {s}" for i, s in enumerate(counter.statements))
+        raise AssertionError(
+            f"expected at most {limit} queries, got {counter.count}:\n{listing}"
+        )
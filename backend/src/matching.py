@@ -0,0 +1,319 @@
+"""
+Swap-cycle matching over the graph of pending knocks.
+
+A pending knock from A on B's room is an edge A -> B. A cycle
+A -> B -> C -> A is a three-way swap everyone has already asked for:
+A moves into B's room, B into C's and C into A's. send_knock keeps
+auto-accepting two-way swaps itself; this module finds the longer ones.
+
+Batch mode (from backend/src) solves the whole graph and prints a set of
+user-disjoint swaps:
+    python matching.py [--max-length 4]
+"""
+from __future__ import annotations
+import os
+import threading
+import time
+from collections import defaultdict
+
+from sqlalchemy import event, inspect, select
+
+from db import db, Room, Knock
+
+MAX_LENGTH      = int(os.environ.get("SWAP_MAX_CYCLE", 4))
+REBUILD_SECONDS = int(os.environ.get("SWAP_GRAPH_REBUILD_SECONDS", 300))
+
+
+class KnockGraph:
+    """
+    Pending knocks as a user -> user adjacency structure.
+
+    out[a][b] = (knock_id, room_id) for a pending knock from a on b's
+    room; inn[b] holds every a. Kept in sync by the ORM events at the
+    bottom of this module and rebuilt every REBUILD_SECONDS by
+    GraphRefresher so other worker processes' knocks are picked up.
+    Cycles found here are only candidates; callers re-check them with
+    `verify`.
+    """
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.built_at: float | None = None
+        self.out: defaultdict = defaultdict(dict)
+        self.inn: defaultdict = defaultdict(set)
+        self.room_owner: dict[int, int] = {}
+
+    # Building / incremental updates
+    def build(self):
+        """
+        (Re)load every pending knock. Needs an app context.
+        """
+        owners = dict(db.session.query(Room.id, Room.owner_id).all())
+        edges = (db.session.query(Knock.id, Knock.from_user_id, Knock.to_room_id)
+                 .filter(Knock.status == "pending")
+                 .all())
+        with self._lock:
+            self.out = defaultdict(dict)
+            self.inn = defaultdict(set)
+            self.room_owner = owners
+            for knock_id, from_user, room_id in edges:
+                owner = owners.get(room_id)
+                if owner is not None:
+                    self._add(from_user, owner, knock_id, room_id)
+            self.built_at = time.monotonic()
+
+    def add_knock(self, knock_id: int, from_user: int, room_id: int, owner: int):
+        with self._lock:
+            self.room_owner[room_id] = owner
+            self._add(from_user, owner, knock_id, room_id)
+
+    def remove_knock(self, from_user: int, room_id: int):
+        with self._lock:
+            owner = self.room_owner.get(room_id)
+            if owner is not None and self.out.get(from_user, {}).pop(owner, None):
+                self.inn[owner].discard(from_user)
+
+    def _add(self, a: int, b: int, knock_id: int, room_id: int):
+        if a != b:
+            self.out[a][b] = (knock_id, room_id)
+            self.inn[b].add(a)
+
+    @property
+    def n_edges(self) -> int:
+        return sum(len(targets) for targets in self.out.values())
+
+    # Search
+    def _dist_to(self, target: int, limit: int, min_node: int | None = None) -> dict[int, int]:
+        """
+        user -> fewest knocks from that user to `target`, for users within
+        `limit` (reverse BFS). With min_node, only users > min_node count.
+        """
+        dist = {target: 0}
+        frontier = [target]
+        for d in range(1, limit + 1):
+            nxt = []
+            for node in frontier:
+                for prev in self.inn.get(node, ()):
+                    if prev not in dist and (min_node is None or prev > min_node):
+                        dist[prev] = d
+                        nxt.append(prev)
+            if not nxt:
+                break
+            frontier = nxt
+        return dist
+
+    def _paths(self, start: int, target: int, budget: int, dist: dict[int, int],
+               min_node: int | None = None):
+        """
+        Simple paths start -> ... -> target of at most `budget` knocks, as
+        node lists without target. `dist` prunes every branch that can't
+        make it back in time, so the search stays local.
+        """
+        path, on_path = [start], {start}
+
+        def walk(node, left):
+            for nxt in self.out.get(node, ()):
+                if nxt == target:
+                    yield list(path)
+                elif (nxt not in on_path and dist.get(nxt, left) < left
+                        and (min_node is None or nxt > min_node)):
+                    path.append(nxt)
+                    on_path.add(nxt)
+                    yield from walk(nxt, left - 1)
+                    path.pop()
+                    on_path.discard(nxt)
+
+        yield from walk(start, budget)
+
+    def cycles_through(self, a: int, b: int, max_length: int = MAX_LENGTH) -> list[list[int]]:
+        """
+        Every swap cycle (list of user ids, starting at `a`) that uses the
+        knock a -> b, shortest first. This is the incremental check run
+        when that knock arrives.
+        """
+        with self._lock:
+            if b not in self.out.get(a, {}):
+                return []
+            dist = self._dist_to(a, max_length - 1)
+            if b not in dist:
+                return []
+            cycles = [[a] + path for path in self._paths(b, a, max_length - 1, dist)]
+        return sorted(cycles, key=len)
+
+    def cycles_of(self, user: int, max_length: int = MAX_LENGTH) -> list[list[int]]:
+        """
+        Every swap cycle `user` is part of, shortest first.
+        """
+        with self._lock:
+            targets = list(self.out.get(user, ()))
+        cycles = [c for b in targets for c in self.cycles_through(user, b, max_length)]
+        return sorted(cycles, key=len)
+
+    def all_cycles(self, max_length: int = MAX_LENGTH) -> list[list[int]]:
+        """
+        Every simple cycle of up to `max_length` users, each exactly once,
+        starting at its smallest user id. This is the batch mode.
+        """
+        cycles = []
+        with self._lock:
+            for s in sorted(self.out):
+                dist = self._dist_to(s, max_length - 1, min_node=s)
+                for b in self.out[s]:
+                    if b > s and b in dist:
+                        cycles.extend([s] + path for path in
+                                      self._paths(b, s, max_length - 1, dist, min_node=s))
+        return cycles
+
+    def steps(self, cycle: list[int]) -> list[dict]:
+        """
+        The knock behind each move of a cycle.
+        """
+        with self._lock:
+            out = []
+            for a, b in zip(cycle, cycle[1:] + cycle[:1]):
+                knock_id, room_id = self.out[a][b]
+                out.append({"knock_id": knock_id, "from_user_id": a, "to_room_id": room_id})
+            return out
+
+
+graph = KnockGraph()
+
+
+class GraphRefresher:
+    """
+    Daemon thread that rebuilds `graph` every REBUILD_SECONDS, so request
+    handlers only ever read it. Until the first build finishes the graph
+    is empty and no cycles are reported.
+    """
+    def __init__(self, interval: int = REBUILD_SECONDS):
+        self.interval = interval
+        self._lock    = threading.Lock()
+        self._stop    = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def ensure_started(self, app):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, args=(app,), name="swap-graph-refresher", daemon=True
+                )
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self, app):
+        while not self._stop.is_set():
+            with app.app_context():
+                try:
+                    graph.build()
+                except Exception:
+                    app.logger.exception("swap graph rebuild failed")
+                    db.session.rollback()
+                finally:
+                    db.session.remove()
+            self._stop.wait(self.interval)
+
+
+graph_refresher = GraphRefresher()
+
+
+def solve(cycles, max_users: int | None = None) -> list[list[int]]:
+    """
+    Pick user-disjoint cycles from `cycles`, greedily: shorter cycles
+    first (fewer people must agree), then the ones whose users appear in
+    the fewest other cycles. Exact cycle packing is NP-hard for cycles
+    longer than two; greedy is what the batch run uses.
+    """
+    cycles = list(cycles)
+    load = defaultdict(int)
+    for cycle in cycles:
+        for user in cycle:
+            load[user] += 1
+    cycles.sort(key=lambda c: (len(c), sum(load[u] for u in c), c))
+
+    taken, picked = set(), []
+    for cycle in cycles:
+        if taken.isdisjoint(cycle):
+            picked.append(cycle)
+            taken.update(cycle)
+            if max_users is not None and len(taken) >= max_users:
+                break
+    return picked
+
+
+def verify(cycles: list[list[int]]) -> list[dict]:
+    """
+    Re-check candidate cycles against the database and describe the ones
+    whose knocks are all still pending as {"users": [...], "knocks": [...]}.
+    """
+    described = []
+    for cycle in cycles:
+        try:
+            described.append({"users": cycle, "knocks": graph.steps(cycle)})
+        except KeyError:  # an edge vanished since the search
+            continue
+    ids = {step["knock_id"] for c in described for step in c["knocks"]}
+    if not ids:
+        return []
+    pending = {knock_id for (knock_id,) in db.session.query(Knock.id)
+               .filter(Knock.id.in_(ids), Knock.status == "pending")}
+    return [c for c in described
+            if all(step["knock_id"] in pending for step in c["knocks"])]
+
+
+# Keep the graph in sync with this process's writes
+@event.listens_for(Knock, "after_insert")
+def _knock_added(mapper, connection, target):
+    if graph.built_at is None or target.status != "pending":
+        return
+    owner = graph.room_owner.get(target.to_room_id)
+    if owner is None:
+        owner = connection.execute(
+            select(Room.owner_id).where(Room.id == target.to_room_id)
+        ).scalar()
+    if owner is not None:
+        graph.add_knock(target.id, target.from_user_id, target.to_room_id, owner)
+
+
+@event.listens_for(Knock, "after_update")
+def _knock_changed(mapper, connection, target):
+    if graph.built_at is None:
+        return
+    if inspect(target).attrs.status.history.has_changes() and target.status != "pending":
+        graph.remove_knock(target.from_user_id, target.to_room_id)
+
+
+@event.listens_for(Knock, "after_delete")
+def _knock_deleted(mapper, connection, target):
+    if graph.built_at is not None:
+        graph.remove_knock(target.from_user_id, target.to_room_id)
+
+
+@event.listens_for(Room, "after_insert")
+def _room_added(mapper, connection, target):
+    if graph.built_at is not None:
+        graph.room_owner[target.id] = target.owner_id
+
+
+if __name__ == "__main__":
+    import argparse
+    from app import app
+
+    parser = argparse.ArgumentParser(description="Find user-disjoint swap cycles.")
+    parser.add_argument("--max-length", type=int, default=MAX_LENGTH)
+    args = parser.parse_args()
+
+    with app.app_context():
+        graph.build()
+        start = time.perf_counter()
+        found = graph.all_cycles(args.max_length)
+        chosen = verify(solve(found))
+        elapsed = time.perf_counter() - start
+
+    print(f"{len(graph.out)} users knocking, {graph.n_edges} pending knocks, "
+          f"{len(found)} cycles of up to {args.max_length} ({elapsed * 1000:.0f} ms)")
+    for cycle in chosen:
+        print(" -> ".join(str(u) for u in cycle["users"] + cycle["users"][:1]))
+    print(f"{len(chosen)} swaps covering {sum(len(c['users']) for c in chosen)} users")
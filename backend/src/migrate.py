@@ -0,0 +1,136 @@
+"""
+Upgrade an existing DormHop database to the current schema.
+
+db.create_all() only creates missing tables; it never alters existing
+ones. Each revision below brings older databases in line with db.py and
+is recorded in `schema_migrations` so it runs exactly once.
+
+Usage (from backend/src):
+    python migrate.py
+"""
+import json
+from datetime import datetime, timezone
+
+from sqlalchemy import inspect, text
+
+from counters import rebuild
+from db import db, User, Room, Knock, Amenity, RoomAmenity, saved_rooms
+
+
+def _columns(conn, table: str) -> set[str]:
+    return {c["name"] for c in inspect(conn).get_columns(table)}
+
+
+def normalize_amenities(conn):
+    """
+    0001: move rooms.amenities (JSON text) into amenities + room_amenities.
+    """
+    if "amenities" not in _columns(conn, "rooms"):
+        return
+
+    rooms = conn.execute(text("SELECT id, amenities FROM rooms")).all()
+    per_room = {
+        room_id: list(dict.fromkeys(json.loads(raw or "[]")))
+        for room_id, raw in rooms
+    }
+
+    wanted = {name for names in per_room.values() for name in names}
+    known = dict(conn.execute(db.select(Amenity.name, Amenity.id)).all())
+    missing = wanted - known.keys()
+    if missing:
+        conn.execute(Amenity.__table__.insert(), [{"name": n} for n in sorted(missing)])
+        known = dict(conn.execute(db.select(Amenity.name, Amenity.id)).all())
+
+    links = [
+        {"room_id": room_id, "amenity_id": known[name], "position": pos}
+        for room_id, names in per_room.items()
+        for pos, name in enumerate(names)
+    ]
+    if links:
+        conn.execute(RoomAmenity.__table__.insert(), links)
+
+    # Requires SQLite >= 3.35 (or any PostgreSQL)
+    conn.execute(text("ALTER TABLE rooms DROP COLUMN amenities"))
+
+
+def add_hot_path_indexes(conn):
+    """
+    0002: indexes for the feed, knock and saved-room lookups.
+    Duplicate knocks are collapsed first so the unique index can build.
+    """
+    conn.execute(text(
+        "DELETE FROM knocks WHERE id NOT IN ("
+        " SELECT MIN(id) FROM knocks GROUP BY from_user_id, to_room_id)"
+    ))
+    for table in (User.__table__, Room.__table__, Knock.__table__,
+                  RoomAmenity.__table__, saved_rooms):
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
+def add_sync_columns(conn):
+    """
+    0003: knocks.updated_at for ?since= delta syncs, backfilled from the
+    last thing that happened to each knock. The tombstones table itself
+    is new, so db.create_all() has already made it.
+    """
+    if "updated_at" in _columns(conn, "knocks"):
+        return
+    conn.execute(text("ALTER TABLE knocks ADD COLUMN updated_at TIMESTAMP"))
+    conn.execute(text("UPDATE knocks SET updated_at = COALESCE(accepted_at, created_at)"))
+
+
+def add_feed_counters(conn):
+    """
+    0004: fill user_counters / listing_counters (new tables, so
+    db.create_all() has made them) from the existing rows.
+    """
+    rebuild(conn)
+
+
+# Ordered (revision id, upgrade function). Append only.
+MIGRATIONS = [
+    ("0001_normalize_amenities", normalize_amenities),
+    ("0002_hot_path_indexes", add_hot_path_indexes),
+    ("0003_sync_columns", add_sync_columns),
+    ("0004_feed_counters", add_feed_counters),
+]
+
+
+def upgrade(engine) -> list[str]:
+    """
+    Apply every pending revision, each in its own transaction.
+    Returns the ids of the revisions that were applied.
+    """
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            " version VARCHAR PRIMARY KEY,"
+            " applied_at VARCHAR NOT NULL)"
+        ))
+        done = {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+    applied = []
+    for version, fn in MIGRATIONS:
+        if version in done:
+            continue
+        with engine.begin() as conn:
+            fn(conn)
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, applied_at) VALUES (:v, :t)"),
+                {"v": version, "t": datetime.now(timezone.utc).isoformat()},
+            )
+        applied.append(version)
+    return applied
+
+
+if __name__ == "__main__":
+    from app import app
+
+    with app.app_context():
+        applied = upgrade(db.engine)
+    if applied:
+        for version in applied:
+            print(f"✅ Applied {version}")
+    else:
+        print("Database already up to date")
@@ -0,0 +1,72 @@
+from __future__ import annotations
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE     = 100
+
+
+def parse_limit(raw: str | None) -> int:
+    """
+    Clamp the ?limit= query param to [1, MAX_PAGE_SIZE].
+    Raises ValueError on non-integers.
+    """
+    if raw is None or raw == "":
+        return DEFAULT_PAGE_SIZE
+    limit = int(raw)
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def encode_cursor(updated_at: datetime, row_id: int) -> str:
+    """
+    Opaque, URL-safe cursor pointing just past (updated_at, id).
+    """
+    payload = {"u": updated_at.isoformat(), "id": row_id}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """
+    Inverse of encode_cursor. Raises ValueError if the cursor is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(payload["u"]), int(payload["id"])
+    except (ValueError, KeyError, TypeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def keyset_query(query, model, cursor: str | None):
+    """
+    `query` in stable newest-first (updated_at DESC, id DESC) order,
+    starting just past `cursor` if one is given.
+    """
+    if cursor:
+        updated_at, last_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            model.updated_at < updated_at,
+            and_(model.updated_at == updated_at, model.id < last_id),
+        ))
+    return query.order_by(model.updated_at.desc(), model.id.desc())
+
+
+def keyset_page(query, model, cursor: str | None, limit: int):
+    """
+    Apply a keyset window (see keyset_query) to `query` and return
+    (rows, next_cursor).
+
+    One extra row is fetched to know whether another page exists, so no
+    COUNT(*) is ever needed.
+    """
+    rows = keyset_query(query, model, cursor).limit(limit + 1).all()
+
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(last.updated_at, last.id)
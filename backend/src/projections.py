@@ -0,0 +1,73 @@
+from __future__ import annotations
+from collections import defaultdict
+
+from db import db, User, Room, Amenity, RoomAmenity
+
+# Read-only fast path for the room feeds.
+#
+# Selecting columns instead of entities skips what the ORM does per row
+# (identity map, instance state, change tracking, relationship loaders)
+# for data that is only ever serialized. The output of room_cards()
+# matches Room.serialize_with_owner(); use the ORM path whenever the rows
+# are going to be modified.
+
+# Order matters: room_cards() unpacks rows positionally
+ROOM_CARD_COLUMNS = (
+    Room.id,
+    Room.dorm,
+    Room.room_number,
+    Room.occupancy,
+    Room.description,
+    Room.gender,
+    Room.updated_at,          # keyset_page reads .updated_at / .id
+    User.full_name.label("owner_full_name"),
+    User.class_year.label("owner_class_year"),
+)
+
+# ids per query in amenities_for()
+IN_CHUNK = 1000
+
+
+def room_cards_query():
+    """
+    Rooms joined to their owners, as plain column tuples. Accepts the same
+    filters as Room.query.join(User).
+    """
+    return db.session.query(*ROOM_CARD_COLUMNS).join(User, Room.owner_id == User.id)
+
+
+def amenities_for(room_ids: list[int]) -> dict[int, list[str]]:
+    """
+    room id -> amenity names in the owner's order, in one query per
+    IN_CHUNK rooms, so an unpaged list never becomes one huge IN list.
+    """
+    out = defaultdict(list)
+    for start in range(0, len(room_ids), IN_CHUNK):
+        rows = (db.session.query(RoomAmenity.room_id, Amenity.name)
+                .join(Amenity, RoomAmenity.amenity_id == Amenity.id)
+                .filter(RoomAmenity.room_id.in_(room_ids[start:start + IN_CHUNK]))
+                .order_by(RoomAmenity.room_id, RoomAmenity.position))
+        for room_id, name in rows:
+            out[room_id].append(name)
+    return out
+
+
+def room_cards(rows) -> list[dict]:
+    """
+    Response dicts for rows of room_cards_query().
+    """
+    amenities = amenities_for([row[0] for row in rows])
+    return [
+        {
+            "id": room_id,
+            "dorm": dorm,
+            "room_number": room_number,
+            "occupancy": occupancy,
+            "amenities": amenities.get(room_id, []),
+            "description": description,
+            "gender": gender,
+            "owner": {"full_name": owner_full_name, "class_year": owner_class_year},
+        }
+        for (room_id, dorm, room_number, occupancy, description, gender, _,
+             owner_full_name, owner_class_year) in rows
+    ]
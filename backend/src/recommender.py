@@ -0,0 +1,281 @@
+from __future__ import annotations
+import os
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+from sqlalchemy import event, inspect
+
+from db import db, User, Room, Amenity, RoomAmenity
+from projections import room_cards_query
+
+AMENITY_WEIGHT   = 0.7
+OCCUPANCY_WEIGHT = 0.3
+REBUILD_SECONDS  = int(os.environ.get("RECOMMENDER_REBUILD_SECONDS", 300))
+
+_GENDER_CODES = {"male": 0, "female": 1, "other": 2}
+
+
+class AmenityIndex:
+    """
+    In-memory room × amenity matrix used to score recommendations.
+
+    Every room gets one row holding a 0/1 vector over the amenity
+    vocabulary plus its occupancy, gender and owner. Rows are kept in
+    sync by the ORM events at the bottom of this module, and the whole
+    index is rebuilt from the database every REBUILD_SECONDS so that
+    changes made by other worker processes are picked up as well.
+
+    `listed` is only a pruning hint; callers must re-check listing
+    status against the database (see `recommend`).
+    """
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.built_at: float | None = None
+        self._reset(capacity=64, width=16)
+
+    def _reset(self, capacity: int, width: int):
+        self.vocab: dict[str, int] = {}
+        self.row_of: dict[int, int] = {}         # room_id  -> row
+        self.rows_of_owner: dict[int, int] = {}  # owner_id -> row
+        self.n_rows     = 0
+        self.room_ids   = np.zeros(capacity, dtype=np.int64)
+        self.owner_ids  = np.zeros(capacity, dtype=np.int64)
+        self.occupancy  = np.zeros(capacity, dtype=np.int32)
+        self.gender     = np.full(capacity, -1, dtype=np.int8)
+        self.sizes      = np.zeros(capacity, dtype=np.float32)  # len(amenities)
+        self.active     = np.zeros(capacity, dtype=bool)
+        self.listed     = np.zeros(capacity, dtype=bool)
+        self.matrix     = np.zeros((capacity, width), dtype=np.float32)
+
+    # Building / incremental updates
+    def build(self):
+        """
+        (Re)load every room from the database. Needs an app context.
+        """
+        rows = (db.session.query(Room.id, Room.owner_id, Room.occupancy,
+                                 Room.gender, User.is_room_listed)
+                .join(User, Room.owner_id == User.id)
+                .all())
+        names = defaultdict(list)
+        for room_id, name in (db.session.query(RoomAmenity.room_id, Amenity.name)
+                              .join(Amenity)
+                              .order_by(RoomAmenity.room_id, RoomAmenity.position)):
+            names[room_id].append(name)
+
+        with self._lock:
+            self._reset(capacity=max(64, len(rows)), width=16)
+            for room_id, owner_id, occ, gender, listed in rows:
+                self._upsert(room_id, owner_id, occ, gender,
+                             names[room_id], bool(listed))
+            self.built_at = time.monotonic()
+
+    def ensure_fresh(self):
+        if self.built_at is None or time.monotonic() - self.built_at > REBUILD_SECONDS:
+            self.build()
+
+    def upsert_room(self, room_id: int, owner_id: int, occupancy: int,
+                    gender: str, amenities: list[str], listed: bool = True):
+        with self._lock:
+            self._upsert(room_id, owner_id, occupancy, gender, amenities, listed)
+
+    def remove_room(self, room_id: int):
+        with self._lock:
+            row = self.row_of.pop(room_id, None)
+            if row is not None:
+                self.active[row] = False
+                self.rows_of_owner.pop(int(self.owner_ids[row]), None)
+
+    def set_listed(self, owner_id: int, listed: bool):
+        with self._lock:
+            row = self.rows_of_owner.get(owner_id)
+            if row is not None:
+                self.listed[row] = listed
+
+    def _upsert(self, room_id, owner_id, occupancy, gender, amenities, listed):
+        row = self.row_of.get(room_id)
+        if row is None:
+            row = self.n_rows
+            self._grow_rows(row + 1)
+            self.n_rows += 1
+            self.row_of[room_id] = row
+
+        cols = [self._column(a) for a in amenities]
+        self.matrix[row, :] = 0.0
+        self.matrix[row, cols] = 1.0
+        self.room_ids[row]  = room_id
+        self.owner_ids[row] = owner_id
+        self.occupancy[row] = occupancy
+        self.gender[row]    = _GENDER_CODES.get(gender, -1)
+        self.sizes[row]     = len(amenities)
+        self.active[row]    = True
+        self.listed[row]    = listed
+        self.rows_of_owner[owner_id] = row
+
+    def _column(self, amenity: str) -> int:
+        col = self.vocab.get(amenity)
+        if col is None:
+            col = self.vocab[amenity] = len(self.vocab)
+            if col >= self.matrix.shape[1]:
+                grown = np.zeros((self.matrix.shape[0], self.matrix.shape[1] * 2),
+                                 dtype=np.float32)
+                grown[:, :self.matrix.shape[1]] = self.matrix
+                self.matrix = grown
+        return col
+
+    def _grow_rows(self, needed: int):
+        capacity = len(self.room_ids)
+        if needed <= capacity:
+            return
+        new_cap = max(needed, capacity * 2)
+        for name in ("room_ids", "owner_ids", "occupancy", "gender",
+                     "sizes", "active", "listed"):
+            old = getattr(self, name)
+            grown = np.zeros(new_cap, dtype=old.dtype)
+            if name == "gender":
+                grown[:] = -1
+            grown[:capacity] = old
+            setattr(self, name, grown)
+        grown = np.zeros((new_cap, self.matrix.shape[1]), dtype=np.float32)
+        grown[:capacity] = self.matrix
+        self.matrix = grown
+
+    # Scoring
+    def top_k(self, amenities: list[str], occupancy: int, gender: str,
+              exclude_owner: int, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Return (room_ids, scores) of the k best candidates, best first.
+
+        score = 0.7 * cosine(amenities) + 0.3 * (1.0 if same occupancy else 0.5)
+        where cosine = |A ∩ B| / sqrt(|A| * |B|).
+        """
+        with self._lock:
+            n = self.n_rows
+            mask = (self.active[:n]
+                    & self.listed[:n]
+                    & (self.gender[:n] == _GENDER_CODES.get(gender, -2))
+                    & (self.owner_ids[:n] != exclude_owner))
+            rows = np.flatnonzero(mask)
+            if rows.size == 0:
+                return rows, np.zeros(0, dtype=np.float32)
+            room_ids = self.room_ids[rows]
+            scores = self._score(rows, amenities, occupancy)
+
+        if k < scores.size:
+            # everything tied with the k-th score, so ties are cut by id below
+            kth = -np.partition(-scores, k - 1)[k - 1]
+            part = np.flatnonzero(scores >= kth)
+        else:
+            part = np.arange(scores.size)
+        # stable on room id so equal scores come back in a fixed order
+        order = part[np.lexsort((room_ids[part], -scores[part]))][:k]
+        return room_ids[order], scores[order]
+
+    def scores_of(self, amenities: list[str], occupancy: int,
+                  room_ids: list[int]) -> dict[int, float]:
+        """
+        room id -> score (as in top_k) for those of `room_ids` that are in
+        the index; rooms another process added since the last rebuild are
+        left out.
+        """
+        with self._lock:
+            known = [rid for rid in room_ids if rid in self.row_of]
+            rows = np.array([self.row_of[rid] for rid in known], dtype=np.int64)
+            scores = self._score(rows, amenities, occupancy)
+        return dict(zip(known, scores.tolist()))
+
+    def _score(self, rows: np.ndarray, amenities: list[str], occupancy: int) -> np.ndarray:
+        user_vec = np.zeros(self.matrix.shape[1], dtype=np.float32)
+        known = [self.vocab[a] for a in amenities if a in self.vocab]
+        user_vec[known] = 1.0
+
+        overlap = self.matrix[rows] @ user_vec
+        denom = np.sqrt(self.sizes[rows] * len(amenities))
+        a_score = np.divide(overlap, denom, out=np.zeros_like(overlap), where=denom > 0)
+        o_score = np.where(self.occupancy[rows] == occupancy, 1.0, 0.5)
+        return AMENITY_WEIGHT * a_score + OCCUPANCY_WEIGHT * o_score
+
+
+index = AmenityIndex()
+
+
+def recommend(current_user, limit: int | None = None) -> list[tuple[tuple, float]]:
+    """
+    Top `limit` (row, score) pairs for the caller, best first, where each
+    row comes from projections.room_cards_query(). With no limit, every
+    room in the caller's pool is returned.
+
+    With a limit, candidates come from the in-memory index; listing,
+    gender and ownership are then re-checked in one SQL query so a stale
+    index can never leak an unlisted room. If some candidates drop out, a
+    larger window is scored until `limit` rooms survive or candidates run
+    out. Without one, the pool is selected with the feed's filters and
+    each room's score is looked up in the index by id.
+    """
+    index.ensure_fresh()
+    my_room = current_user.room
+    amenities = my_room.amenities
+    if limit is None:
+        return _recommend_all(current_user, amenities, my_room.occupancy)
+
+    k = limit
+    while True:
+        room_ids, scores = index.top_k(amenities, my_room.occupancy,
+                                       current_user.gender, current_user.id, k)
+        if room_ids.size == 0:
+            return []
+
+        rooms = (_pool(current_user)
+                 .filter(Room.id.in_(room_ids.tolist()))
+                 .all())
+        by_id = {r.id: r for r in rooms}
+        picked = [(by_id[rid], float(score))
+                  for rid, score in zip(room_ids.tolist(), scores.tolist())
+                  if rid in by_id]
+
+        if len(picked) >= limit or room_ids.size < k:
+            return picked[:limit]
+        k *= 4
+
+
+def _pool(current_user):
+    """
+    room_cards_query() for the rooms the caller may be recommended: the
+    same filters as the feed.
+    """
+    return room_cards_query().filter(User.is_room_listed.is_(True),
+                                     User.gender == current_user.gender,
+                                     Room.owner_id != current_user.id)
+
+
+def _recommend_all(current_user, amenities: list[str], occupancy: int):
+    rows = _pool(current_user).all()
+    scores = index.scores_of(amenities, occupancy, [r.id for r in rows])
+    picked = [(r, scores[r.id]) for r in rows if r.id in scores]
+    picked.sort(key=lambda pair: (-pair[1], pair[0].id))
+    return picked
+
+
+# Keep the index in sync with this process's writes
+@event.listens_for(Room, "after_insert")
+@event.listens_for(Room, "after_update")
+def _room_changed(mapper, connection, target):
+    if index.built_at is None:
+        return
+    index.upsert_room(target.id, target.owner_id, target.occupancy,
+                      target.gender, target.amenities)
+
+
+@event.listens_for(Room, "after_delete")
+def _room_deleted(mapper, connection, target):
+    if index.built_at is not None:
+        index.remove_room(target.id)
+
+
+@event.listens_for(User, "after_update")
+def _user_changed(mapper, connection, target):
+    if index.built_at is None:
+        return
+    if inspect(target).attrs.is_room_listed.history.has_changes():
+        index.set_listed(target.id, bool(target.is_room_listed))
@@ -1,9 +1,15 @@
 from __future__ import annotations
-import re
+import os
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 from urls import DORM_URLS
 
+try:
+    import lxml  # noqa: F401
+    _DEFAULT_PARSER = "lxml"
+except ImportError:
+    _DEFAULT_PARSER = "html.parser"
+
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (DormHop internal scraper)"
 }
@@ -14,25 +20,58 @@ HEADINGS = {
     "Amenities",
     "Community amenities",
 }
+# what a heading's text is compared against, after strip/rstrip(":")/lower()
+_HEADINGS_LOWER = frozenset(h.lower() for h in HEADINGS)
+_HEADING_TAGS   = ["h1", "h2", "h3", "h4", "h5", "h6"]
+
+# BeautifulSoup tree builder: "lxml" (C, default when installed) or
+# "html.parser" (pure Python)
+PARSER = os.environ.get("SCRAPER_PARSER", _DEFAULT_PARSER)
+# Only build the tree for the page's <main> region; nav, header and footer
+# markup is skipped. Falls back to the full page if <main> yields no
+# features (no heading, or a heading whose list lies outside <main>).
+MAIN_ONLY = os.environ.get("SCRAPER_MAIN_ONLY", "1") != "0"
+_MAIN_STRAINER = SoupStrainer("main")
 
-def scrape_community_features(url: str, timeout: int = 10) -> list[str]:
+def scrape_community_features(url: str, timeout: int = 10,
+                              session: requests.Session | None = None) -> list[str]:
     """
     Return a list of features (strings) pulled from a Cornell dorm page.
+    Pass a shared `session` to reuse connections across many pages.
     """
-    resp = requests.get(url, headers=HEADERS, timeout=timeout)
+    resp = (session or requests).get(url, headers=HEADERS, timeout=timeout)
     resp.raise_for_status()
+    return parse_community_features(resp.text)
+
+
+def parse_community_features(html: str, parser: str | None = None,
+                             main_only: bool | None = None) -> list[str]:
+    """
+    Extract the feature list from an already-downloaded dorm page.
+    `parser` and `main_only` default to SCRAPER_PARSER / SCRAPER_MAIN_ONLY.
+    """
+    parser = parser or PARSER
+    main_only = MAIN_ONLY if main_only is None else main_only
+
+    if main_only:
+        features = _extract(BeautifulSoup(html, parser, parse_only=_MAIN_STRAINER))
+        if features:
+            return features
+    return _extract(BeautifulSoup(html, parser)) or []
 
-    soup = BeautifulSoup(resp.text, "html.parser")
 
+def _extract(soup: BeautifulSoup) -> list[str] | None:
+    """
+    Features under the first matching heading, or None if there is none.
+    """
     # 1. Find a heading that matches (ignoring trailing colons & case)
     heading = None
-    for tag in soup.find_all(re.compile(r"^h[1-6]$")):
-        text = tag.get_text(strip=True).rstrip(":").lower()
-        if any(text == h.lower() for h in HEADINGS):
+    for tag in soup.find_all(_HEADING_TAGS):
+        if tag.get_text(strip=True).rstrip(":").lower() in _HEADINGS_LOWER:
             heading = tag
             break
     if not heading:
-        return []
+        return None
 
     # 2. Look for the first <p> or <ul> after that heading
     section = heading.find_next(["p", "ul"])
@@ -0,0 +1,56 @@
+from __future__ import annotations
+import json
+import os
+from datetime import datetime, timezone
+
+from flask import Response
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder produces the same JSON
+    orjson = None
+
+# "orjson" (default when installed) or "json"
+BACKEND = os.environ.get("JSON_BACKEND", "orjson" if orjson else "json")
+if BACKEND == "orjson" and orjson is None:
+    BACKEND = "json"
+
+_ORJSON_OPTS = (orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z | orjson.OPT_SERIALIZE_NUMPY) if orjson else 0
+
+
+def isoformat(value: datetime) -> str:
+    """
+    ISO-8601 in UTC with a trailing "Z". Naive datetimes are taken to be
+    UTC, which is how every DateTime column is stored.
+    """
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat() + "Z"
+
+
+def _default(obj):
+    if isinstance(obj, datetime):
+        return isoformat(obj)
+    if hasattr(obj, "tolist"):  # numpy scalars and arrays
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj) -> bytes:
+    """
+    Encode a response body as compact UTF-8 JSON; datetimes become
+    isoformat() strings (see above) under either backend.
+    """
+    if BACKEND == "orjson":
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTS)
+    return json.dumps(obj, default=_default, separators=(",", ":"),
+                      ensure_ascii=False).encode()
+
+
+class JSONResponse(Response):
+    """
+    app.response_class: views return `(dumps(...), status)` tuples and
+    get an application/json content type.
+    """
+    default_mimetype = "application/json"
+
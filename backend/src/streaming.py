@@ -0,0 +1,71 @@
+from __future__ import annotations
+import os
+from itertools import islice
+
+from flask import Response, request, stream_with_context
+
+from serializers import dumps
+
+# Rows fetched per round trip from the server-side cursor; also the
+# granularity at which response bytes are flushed
+BATCH_SIZE = int(os.environ.get("STREAM_BATCH_SIZE", 500))
+
+FORMATS = ("json", "ndjson")
+
+
+def stream_format() -> str | None:
+    """
+    The ?stream= mode of the current request ("json" or "ndjson"), or
+    None for a regular buffered response.
+    Raises ValueError for any other value.
+    """
+    fmt = request.args.get("stream")
+    if fmt is None:
+        return None
+    if fmt not in FORMATS:
+        raise ValueError("stream must be 'json' or 'ndjson'")
+    return fmt
+
+
+def batched(iterable, size: int = BATCH_SIZE):
+    """
+    Lists of up to `size` items; pairs with Query.yield_per(size) so each
+    batch is one fetch from the cursor.
+    """
+    it = iter(iterable)
+    while (batch := list(islice(it, size))):
+        yield batch
+
+
+def stream_items(fmt: str, key: str, batches, with_total: bool = False) -> Response:
+    """
+    Stream lists of dicts as they are produced.
+
+    "json"   -> {"<key>": [...]} (plus "total" if with_total), the same
+                document a buffered response would carry
+    "ndjson" -> one object per line, application/x-ndjson
+
+    Only one batch is held in memory at a time. The generator runs inside
+    the request context, so `batches` may lazily iterate a query.
+    """
+    def generate_json():
+        yield b"{" + dumps(key) + b":["
+        total = 0
+        for batch in batches:
+            if batch:
+                yield (b"," if total else b"") + b",".join(map(dumps, batch))
+                total += len(batch)
+        yield b"]" + (b',"total":' + dumps(total) if with_total else b"") + b"}"
+
+    def generate_ndjson():
+        for batch in batches:
+            if batch:
+                yield b"\n".join(map(dumps, batch)) + b"\n"
+
+    if fmt == "ndjson":
+        body, mimetype = generate_ndjson(), "application/x-ndjson"
+    else:
+        body, mimetype = generate_json(), "application/json"
+    # X-Accel-Buffering: let nginx pass chunks through as they are written
+    return Response(stream_with_context(body), mimetype=mimetype,
+                    headers={"X-Accel-Buffering": "no"})
@@ -0,0 +1,112 @@
+from __future__ import annotations
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import event, inspect
+
+from db import db, User, Room, Knock, Tombstone
+from serializers import isoformat
+
+# Changes committed this close to a sync are sent again on the next one,
+# covering transactions that stamped updated_at before committing
+OVERLAP        = timedelta(seconds=int(os.environ.get("SYNC_OVERLAP_SECONDS", 5)))
+TOMBSTONE_TTL  = timedelta(days=int(os.environ.get("SYNC_TOMBSTONE_DAYS", 30)))
+MAX_CHANGES    = int(os.environ.get("SYNC_MAX_CHANGES", 1000))
+PRUNE_INTERVAL = 3600
+
+
+class ResyncRequired(Exception):
+    """
+    The delta can't be answered; the client should refetch everything.
+    """
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def parse_since(raw: str) -> datetime:
+    """
+    ?since= value (an ISO-8601 timestamp, e.g. a previous `next_since`)
+    as naive UTC, the way DateTime columns are stored.
+    Raises ValueError if malformed, ResyncRequired if older than the
+    tombstones we keep.
+    """
+    try:
+        since = datetime.fromisoformat(raw.strip().replace("Z", "+00:00"))
+    except (ValueError, AttributeError) as exc:
+        raise ValueError("since must be an ISO-8601 timestamp") from exc
+    if since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    if since < _utcnow() - TOMBSTONE_TTL:
+        raise ResyncRequired("since is older than the sync history")
+    return since
+
+
+def next_since(started: datetime) -> str:
+    """
+    Token for the client's next sync, given when this one started.
+    """
+    return isoformat(started - OVERLAP)
+
+
+def changed(query, condition) -> list:
+    """
+    Rows of `query` matching `condition` (e.g. updated_at > since), capped
+    at MAX_CHANGES (past that a full refetch is cheaper).
+    """
+    rows = query.filter(condition).limit(MAX_CHANGES + 1).all()
+    if len(rows) > MAX_CHANGES:
+        raise ResyncRequired("too many changes; refetch without since")
+    return rows
+
+
+def removed_ids(kind: str, since: datetime, user_id: int | None = None) -> set[int]:
+    """
+    Ids of `kind` tombstoned after `since`; room tombstones are public,
+    knock tombstones are per party.
+    """
+    rows = (db.session.query(Tombstone.object_id)
+            .filter(Tombstone.kind == kind,
+                    Tombstone.user_id.is_(None) if user_id is None else Tombstone.user_id == user_id,
+                    Tombstone.removed_at > since))
+    return {object_id for (object_id,) in rows}
+
+
+def record_tombstones(session):
+    """
+    Write tombstones inside the flush that deletes a room or knock, or
+    unlists a room. Re-listing bumps the room's updated_at instead, so
+    it comes back as a change.
+    """
+    last_prune = [0.0]
+
+    @event.listens_for(session, "before_flush")
+    def _record(sess, flush_context, instances):
+        now = datetime.now(timezone.utc)
+        stones = []
+        with sess.no_autoflush:
+            for obj in sess.deleted:
+                if isinstance(obj, Room):
+                    stones.append(Tombstone(kind="room", object_id=obj.id, removed_at=now))
+                elif isinstance(obj, Knock):
+                    for party in {obj.from_user_id, obj.to_room.owner_id}:
+                        stones.append(Tombstone(kind="knock", object_id=obj.id,
+                                                user_id=party, removed_at=now))
+            for obj in sess.dirty:
+                if (isinstance(obj, User)
+                        and inspect(obj).attrs.is_room_listed.history.has_changes()
+                        and obj.room is not None):
+                    if obj.is_room_listed:
+                        obj.room.updated_at = now
+                    else:
+                        stones.append(Tombstone(kind="room", object_id=obj.room.id, removed_at=now))
+        if not stones:
+            return
+        sess.add_all(stones)
+        if time.monotonic() - last_prune[0] > PRUNE_INTERVAL:
+            last_prune[0] = time.monotonic()
+            sess.connection().execute(Tombstone.__table__.delete().where(
+                Tombstone.removed_at < _utcnow() - TOMBSTONE_TTL
+            ))
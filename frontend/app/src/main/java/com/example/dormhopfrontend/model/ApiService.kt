@@ -9,7 +9,9 @@ import retrofit2.http.*
  */
 data class RoomsResponse(
     val rooms: List<RoomDto>,
-    val total: Int
+    val total: Int,
+    @SerializedName("next_cursor")
+    val nextCursor: String? = null
 )
 
 /**
@@ -125,10 +127,14 @@ interface ApiService {
     suspend fun getProfile(): Response<UserDto>
 
     /**
-     * List all publicly listed rooms.
+     * List one page of publicly listed rooms.
+     * Pass the previous page's nextCursor to continue.
      */
     @GET("rooms/")
-    suspend fun listRooms(): Response<RoomsResponse>
+    suspend fun listRooms(
+        @Query("cursor") cursor: String? = null,
+        @Query("limit") limit: Int? = null
+    ): Response<RoomsResponse>
 
     /** Fetch a single room by its ID */
     @GET("rooms/{id}/")
@@ -11,13 +11,22 @@ class RoomRepository @Inject constructor(
     private val api: ApiService
 ) {
 
+    // Cursor for the next page of the feed; null once the feed is exhausted.
+    private var nextCursor: String? = null
+
     /**
-     * Fetches all listed rooms.
+     * Fetches the first page of listed rooms and resets paging.
      */
     suspend fun listRooms(): List<RoomDto> {
+        nextCursor = null
+        return fetchPage(null)
+    }
+
+    private suspend fun fetchPage(cursor: String?): List<RoomDto> {
         return try {
-            val resp = api.listRooms()
+            val resp = api.listRooms(cursor = cursor, limit = PAGE_SIZE)
             if (resp.isSuccessful) {
+                nextCursor = resp.body()?.nextCursor
                 resp.body()?.rooms.orEmpty()
             } else {
                 Log.e(TAG, "listRooms failed: ${resp.code()} ${resp.message()}")
@@ -117,11 +126,15 @@ class RoomRepository @Inject constructor(
     }
 
     /**
-     * Stub for paging: fetches the next “page” of rooms.
-     * Currently just re‐calls listRooms().
+     * Fetches the next page of rooms, or nothing if the feed is exhausted.
      */
     suspend fun loadNextPage(): List<RoomDto> {
-        return listRooms()
+        val cursor = nextCursor ?: return emptyList()
+        return fetchPage(cursor)
+    }
+
+    companion object {
+        private const val PAGE_SIZE = 50
     }
 }
 